@@ -6,16 +6,18 @@ from datetime import datetime
 from pathlib import Path
 from contextlib import asynccontextmanager
 from fastapi import FastAPI, UploadFile, File, HTTPException, Depends
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, Response
 
 
 # Auth & Database Imports
 from auth.models import UserRegister, UserLogin, TokenResponse
 from auth.security import hash_password, verify_password, create_access_token
 from auth.middleware import get_current_user
-from auth.repository import create_user, get_user_by_username 
+from auth.repository import create_user, get_user_by_username, get_user_by_username_async, delete_user_async
 from database.connection import get_db
+from database.async_connection import get_async_db, init_async_pool, close_async_pool
 from api.billing_routes import router as billing_router
+from api.export_routes import router as export_router
 
 # Rate Limiting Import
 from rate_limit.dependency import rate_limit_dependency
@@ -28,7 +30,9 @@ from jobs.janitor import cleanup_stuck_jobs
 # Logic & Job Manager Imports
 from review.excel_diff import diff_and_learn
 from tenants.manager import get_tenant_paths
-from jobs.manager import create_job, get_job
+from jobs.manager import create_job_async, get_job_async, get_job_result
+from output.results import RESULT_FORMATS, render_result
+from storage.cache import sha256_stream
 import logging
 
 # -----------------------------
@@ -38,8 +42,8 @@ async def janitor_loop():
     """Infinite loop that runs the janitor every 5 minutes."""
     while True:
         try:
-            # Cleans jobs stuck in PROCESSING for > 10 mins
-            cleanup_stuck_jobs(timeout_minutes=10)
+            # Cleans jobs stuck in PROCESSING for > 10 mins (sync DB code, so off the event loop)
+            await asyncio.to_thread(cleanup_stuck_jobs, timeout_minutes=10)
         except Exception as e:
             print(f"❌ Janitor Loop Error: {e}")
         
@@ -48,11 +52,13 @@ async def janitor_loop():
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Startup: Start the background janitor
+    # Startup: Open the async DB pool and start the background janitor
+    await init_async_pool()
     janitor_task = asyncio.create_task(janitor_loop())
     yield
     # Shutdown: Stop the janitor task
     janitor_task.cancel()
+    await close_async_pool()
 
 #---LOGGING SERVICES---
 logging.basicConfig(
@@ -68,6 +74,7 @@ app = FastAPI(
 
 # Register the billing routes
 app.include_router(billing_router)
+app.include_router(export_router)
 
 # --- CONFIGURATION ---
 UPLOAD_DIR = Path("uploads")
@@ -144,22 +151,19 @@ async def invite_user(email: str, user=Depends(get_current_user)):
 
     tenant_id = user["tenant_id"]
 
-    with get_db() as conn:
-        with conn.cursor() as cur:
+    async with get_async_db() as conn:
+        async with conn.transaction():
             # Check Seat Limits
-            cur.execute("SELECT max_seats FROM tenants WHERE id = %s", (tenant_id,))
-            max_seats = cur.fetchone()[0]
-            cur.execute("SELECT COUNT(*) FROM users WHERE tenant_id = %s", (tenant_id,))
-            if cur.fetchone()[0] >= max_seats:
+            max_seats = await conn.fetchval("SELECT max_seats FROM tenants WHERE id = $1", tenant_id)
+            seats_used = await conn.fetchval("SELECT COUNT(*) FROM users WHERE tenant_id = $1", tenant_id)
+            if seats_used >= max_seats:
                 raise HTTPException(status_code=403, detail="Seat limit reached for your plan.")
 
             # Generate Token
-            cur.execute("""
+            token = await conn.fetchval("""
                 INSERT INTO invitations (tenant_id, email) 
-                VALUES (%s, %s) RETURNING token
-            """, (tenant_id, email))
-            token = cur.fetchone()[0]
-            conn.commit()
+                VALUES ($1, $2) RETURNING token
+            """, tenant_id, email)
 
     return {"invite_link": f"/register/join?token={token}", "expires": "48 hours"}
 
@@ -235,10 +239,13 @@ async def upload_invoice(
     file_name = f"{timestamp}__{uuid.uuid4().hex[:8]}__{file.filename}"
     input_path = UPLOAD_DIR / file_name
 
+    # Hash the spooled upload so workers can serve duplicate scans from cache
+    content_hash = sha256_stream(file.file)
+
     # 1. ATOMIC CREDIT CHECK & JOB CREATION
     try:
         # If credits < 50, create_job raises an Exception
-        job_id = create_job(tenant_id, str(input_path), priority=priority_level)
+        job_id = await create_job_async(tenant_id, str(input_path), priority=priority_level, content_hash=content_hash)
     except Exception as e:
         # Returns 402 Payment Required for insufficient credits
         raise HTTPException(status_code=402, detail=str(e))
@@ -258,7 +265,7 @@ async def upload_invoice(
 
 @app.get("/status/{job_id}")
 async def get_status(job_id: str, user=Depends(get_current_user)):
-    job = get_job(job_id)
+    job = await get_job_async(job_id)
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
     
@@ -270,9 +277,17 @@ async def get_status(job_id: str, user=Depends(get_current_user)):
     return {
         "job_id": str(job["id"] if isinstance(job, dict) else job[0]),
         "status": job["status"] if isinstance(job, dict) else job[2],
-        "output_file": Path(job["output_path"]).name if (isinstance(job, dict) and job.get("output_path")) else None
+        "output_file": output_file_for(job)
     }
 
+def output_file_for(job):
+    """Download name for a finished job: a legacy output file, else its stored result as Excel."""
+    if job.get("output_path"):
+        return Path(job["output_path"]).name
+    if job.get("status") in ("COMPLETED", "REVIEW_REQUIRED"):
+        return f"{job['id']}.xlsx"
+    return None
+
 @app.delete("/tenant/users/{username}")
 async def delete_user_from_tenant(username: str, user=Depends(get_current_user)):
     """
@@ -287,33 +302,44 @@ async def delete_user_from_tenant(username: str, user=Depends(get_current_user))
     if username == user["sub"]:
         raise HTTPException(status_code=400, detail="You cannot delete your own admin account.")
 
-    with get_db() as conn:
-        with conn.cursor() as cur:
-            # 3. Tenant Isolation Check: Does this user actually belong to the Admin's tenant?
-            cur.execute(
-                "SELECT tenant_id FROM users WHERE username = %s", 
-                (username,)
-            )
-            target_user = cur.fetchone()
+    # 3. Tenant Isolation Check: Does this user actually belong to the Admin's tenant?
+    target_user = await get_user_by_username_async(username)
 
-            if not target_user:
-                raise HTTPException(status_code=404, detail="User not found.")
+    if not target_user:
+        raise HTTPException(status_code=404, detail="User not found.")
 
-            if target_user[0] != user["tenant_id"]:
-                raise HTTPException(
-                    status_code=403, 
-                    detail="Unauthorized: This user belongs to a different organization."
-                )
+    if target_user["tenant_id"] != user["tenant_id"]:
+        raise HTTPException(
+            status_code=403, 
+            detail="Unauthorized: This user belongs to a different organization."
+        )
 
-            # 4. Perform Deletion
-            cur.execute("DELETE FROM users WHERE username = %s", (username,))
-            conn.commit()
+    # 4. Perform Deletion
+    await delete_user_async(username)
 
     return {"message": f"User {username} has been removed. 1 seat has been freed."}
 
 @app.get("/download/{filename}")
 def download_result(filename: str, user=Depends(get_current_user)):
+    """
+    `<job_id>.xlsx|csv|json` renders the job's stored result (cached after the first
+    request). Any other name is looked up in the tenant's clean/review folders.
+    """
     tenant_id = user["tenant_id"]
+
+    job_id, _, fmt = filename.rpartition(".")
+    if fmt in RESULT_FORMATS and is_uuid(job_id):
+        result = get_job_result(job_id)
+        if result:
+            # Strict Tenant Isolation
+            if str(result["tenant_id"]) != str(tenant_id):
+                raise HTTPException(status_code=403, detail="Unauthorized")
+            return Response(
+                content=render_result(result, fmt),
+                media_type=RESULT_FORMATS[fmt],
+                headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+            )
+
     paths = get_tenant_paths(tenant_id)
     for folder in ["clean", "review"]:
         file_path = paths[folder] / filename
@@ -321,6 +347,13 @@ def download_result(filename: str, user=Depends(get_current_user)):
             return FileResponse(file_path)
     raise HTTPException(status_code=404, detail="File not found")
 
+def is_uuid(value):
+    try:
+        uuid.UUID(value)
+        return True
+    except ValueError:
+        return False
+
 @app.post("/reupload_corrected")
 async def reupload_corrected(file: UploadFile = File(...), user=Depends(get_current_user)):
     tenant_id = user["tenant_id"]
@@ -332,20 +365,21 @@ async def reupload_corrected(file: UploadFile = File(...), user=Depends(get_curr
         shutil.copyfileobj(file.file, buffer)
 
     try:
-        diff_and_learn(save_path, tenant_id=tenant_id)
+        # Reading the workbook and saving memory is blocking file I/O: keep it off the event loop
+        await asyncio.to_thread(diff_and_learn, save_path, tenant_id=tenant_id)
         return {"status": "SUCCESS", "message": "AI model updated"}
     except Exception as e:
         raise HTTPException(status_code=422, detail=f"Learning failed: {str(e)}")
 
 @app.get("/tenant/metrics")
 async def tenant_metrics(user=Depends(get_current_user)):
-    return get_tenant_dashboard_metrics(user["tenant_id"])
+    return await get_tenant_dashboard_metrics(user["tenant_id"])
 
 @app.get("/admin/metrics")
 async def admin_metrics(user=Depends(get_current_user)):
     if user.get("role") != "admin": # System-wide admin check
         raise HTTPException(status_code=403, detail="Admin access required")
-    return get_system_admin_metrics()
+    return await get_system_admin_metrics()
 
 @app.get("/health")
 def health_check(user=Depends(get_current_user)):
@@ -0,0 +1,219 @@
+#api/export_routes.py
+import io
+import os
+import csv
+import json
+import uuid
+import base64
+from datetime import date, datetime, timedelta
+from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi.responses import StreamingResponse
+from auth.middleware import get_current_user
+from database.async_connection import get_async_db
+from parser.models import InvoiceRow
+
+# Parquet needs pyarrow; JSON Lines and CSV work without it
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+# --- CONFIGURATION ---
+EXPORT_PAGE_SIZE = int(os.getenv("EXPORT_PAGE_SIZE", "500"))     # invoices fetched per keyset page
+EXPORT_MAX_LIMIT = 50000                                          # invoices per paginated request
+
+router = APIRouter(prefix="/export", tags=["Export"])
+
+# One exported record per invoice line; invoice-level fields are repeated on each line
+EXPORT_COLUMNS = ["job_id", "finished_at", "invoice_status", "company_name"] + list(InvoiceRow.COLUMNS)
+
+MEDIA_TYPES = {
+    "jsonl": "application/x-ndjson",
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+# Keyset bounds: results are ordered by (updated_at, job_id)
+NIL_UUID = "00000000-0000-0000-0000-000000000000"
+MAX_UUID = "ffffffff-ffff-ffff-ffff-ffffffffffff"
+
+
+def encode_cursor(updated_at, job_id):
+    return base64.urlsafe_b64encode(f"{updated_at.isoformat()}|{job_id}".encode()).decode()
+
+def decode_cursor(cursor):
+    # Validated here: once streaming starts, a bad value can no longer become a 400
+    try:
+        updated_at, job_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(updated_at), str(uuid.UUID(job_id))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+async def find_page_end(tenant_id, after, until, limit):
+    """Key of the `limit`-th result after `after`, or None if fewer remain (last page)."""
+    async with get_async_db() as conn:
+        row = await conn.fetchrow("""
+            SELECT r.updated_at, r.job_id FROM job_results r
+            JOIN jobs j ON j.id = r.job_id
+            WHERE r.tenant_id = $1
+              AND j.status IN ('COMPLETED', 'REVIEW_REQUIRED')
+              AND (r.updated_at, r.job_id) > ($2, $3::uuid)
+              AND r.updated_at < $4
+            ORDER BY r.updated_at, r.job_id
+            OFFSET $5 LIMIT 1
+        """, tenant_id, after[0], after[1], until, limit - 1)
+    return (row["updated_at"], str(row["job_id"])) if row else None
+
+async def iter_result_pages(tenant_id, after, until, last=None):
+    """
+    Yields lists of job_results records, EXPORT_PAGE_SIZE at a time, by keyset
+    pagination on (updated_at, job_id). A connection is borrowed per page, so a
+    slow client never holds one for the whole export.
+    Only jobs that may be downloaded are exported (same rule as get_job_result):
+    a job that failed billing keeps its stored result but never hands it out.
+    """
+    last = last or (datetime.max, MAX_UUID)
+    while True:
+        async with get_async_db() as conn:
+            records = await conn.fetch("""
+                SELECT r.job_id, r.updated_at, r.status, r.company_name, r.line_items
+                FROM job_results r
+                JOIN jobs j ON j.id = r.job_id
+                WHERE r.tenant_id = $1
+                  AND j.status IN ('COMPLETED', 'REVIEW_REQUIRED')
+                  AND (r.updated_at, r.job_id) > ($2, $3::uuid)
+                  AND (r.updated_at, r.job_id) <= ($4, $5::uuid)
+                  AND r.updated_at < $6
+                ORDER BY r.updated_at, r.job_id
+                LIMIT $7
+            """, tenant_id, after[0], after[1], last[0], last[1], until, EXPORT_PAGE_SIZE)
+        if not records:
+            return
+        yield records
+        if len(records) < EXPORT_PAGE_SIZE:
+            return
+        after = (records[-1]["updated_at"], str(records[-1]["job_id"]))
+
+def flatten(records):
+    """One dict per invoice line, with EXPORT_COLUMNS keys."""
+    lines = []
+    for record in records:
+        invoice = {
+            "job_id": str(record["job_id"]),
+            "finished_at": record["updated_at"],
+            "invoice_status": record["status"],
+            "company_name": record["company_name"],
+        }
+        for item in record["line_items"] or []:
+            line = dict(invoice)
+            for column in InvoiceRow.COLUMNS:
+                line[column] = item.get(column)
+            lines.append(line)
+    return lines
+
+
+# --- ENCODERS: each turns the page stream into a byte stream ---
+
+async def encode_jsonl(pages):
+    async for records in pages:
+        lines = flatten(records)
+        for line in lines:
+            line["finished_at"] = line["finished_at"].isoformat()
+        yield "".join(json.dumps(line) + "\n" for line in lines).encode("utf-8")
+
+async def encode_csv(pages):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_COLUMNS)
+    writer.writeheader()
+    yield buffer.getvalue().encode("utf-8")
+    async for records in pages:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(flatten(records))
+        yield buffer.getvalue().encode("utf-8")
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file object that hands back whatever was written since the last drain()."""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def drain(self):
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+async def encode_parquet(pages):
+    # One row group per page: only one page is ever held in memory
+    schema = pa.schema(
+        [("job_id", pa.string()), ("finished_at", pa.timestamp("us"))] +
+        [(column, pa.string()) for column in EXPORT_COLUMNS[2:]]
+    )
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema)
+    try:
+        async for records in pages:
+            lines = flatten(records)
+            for line in lines:
+                for column in InvoiceRow.COLUMNS:
+                    if line[column] is not None:
+                        line[column] = str(line[column])
+            writer.write_table(pa.Table.from_pylist(lines, schema=schema))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+ENCODERS = {"jsonl": encode_jsonl, "csv": encode_csv, "parquet": encode_parquet}
+
+
+@router.get("/results")
+async def export_results(
+    start: date,
+    end: date,
+    fmt: str = Query("jsonl", alias="format"),
+    cursor: str = None,
+    limit: int = Query(None, ge=1, le=EXPORT_MAX_LIMIT),
+    user=Depends(get_current_user)
+):
+    """
+    Streams the tenant's job results finished between `start` and `end` (inclusive)
+    as JSON Lines, CSV or Parquet, one record per invoice line.
+    Without `limit` the whole range is streamed. With it, at most `limit` invoices
+    are sent and the X-Next-Cursor header (when present) resumes after them.
+    """
+    if fmt not in ENCODERS:
+        raise HTTPException(status_code=400, detail=f"Unsupported format. Use one of: {', '.join(ENCODERS)}")
+    if fmt == "parquet" and not PARQUET_AVAILABLE:
+        raise HTTPException(status_code=501, detail="Parquet export needs pyarrow on the server")
+    if end < start:
+        raise HTTPException(status_code=400, detail="end must not be before start")
+
+    tenant_id = user["tenant_id"]
+    after = decode_cursor(cursor) if cursor else (datetime.combine(start, datetime.min.time()), NIL_UUID)
+    until = datetime.combine(end + timedelta(days=1), datetime.min.time())
+
+    headers = {"Content-Disposition": f'attachment; filename="results_{start}_{end}.{fmt}"'}
+    last = None
+    if limit:
+        last = await find_page_end(tenant_id, after, until, limit)
+        if last:
+            headers["X-Next-Cursor"] = encode_cursor(*last)
+
+    pages = iter_result_pages(tenant_id, after, until, last)
+    return StreamingResponse(ENCODERS[fmt](pages), media_type=MEDIA_TYPES[fmt], headers=headers)
@@ -2,6 +2,7 @@
 import uuid
 import psycopg2
 from database.connection import get_db
+from database.async_connection import get_async_db, record_to_dict
 from psycopg2.extras import RealDictCursor
 
 def create_user(username, password_hash, tenant_id, role="member"):
@@ -32,4 +33,18 @@ def get_user_by_username(username):
     with get_db() as conn:
         with conn.cursor(cursor_factory=RealDictCursor) as cur:
             cur.execute(query, (username,))
-            return cur.fetchone()
\ No newline at end of file
+            return cur.fetchone()
+
+async def get_user_by_username_async(username):
+    """Async get_user_by_username for the async API routes."""
+    async with get_async_db() as conn:
+        row = await conn.fetchrow("""
+            SELECT id, username, hashed_password, tenant_id, role
+            FROM users
+            WHERE username = $1
+        """, username)
+        return record_to_dict(row)
+
+async def delete_user_async(username):
+    async with get_async_db() as conn:
+        await conn.execute("DELETE FROM users WHERE username = $1", username)
\ No newline at end of file
@@ -68,4 +68,31 @@ def debit_credits_for_job(tenant_id: str, cost: int = 50):
             
             conn.commit()
             print(f"💰 Debited {cost} credits from {tenant_id}")
+    return True
+
+async def debit_credits_for_job_async(conn, tenant_id: str, cost: int = 50):
+    """
+    Async version of debit_credits_for_job for the API. Runs on the caller's
+    asyncpg connection so the debit and the job insert share one transaction.
+    """
+    # 1. Check current balance (row lock so concurrent uploads cannot overdraw)
+    row = await conn.fetchrow(
+        "SELECT credits FROM billing_accounts WHERE tenant_id = $1 FOR UPDATE", tenant_id
+    )
+    if not row or row["credits"] < cost:
+        raise Exception(f"Insufficient credits. Required: {cost}, Available: {row['credits'] if row else 0}")
+
+    # 2. Subtract the credits
+    await conn.execute("""
+        UPDATE billing_accounts 
+        SET credits = credits - $1 
+        WHERE tenant_id = $2
+    """, cost, tenant_id)
+
+    # 3. Log the transaction
+    await conn.execute("""
+        INSERT INTO payment_transactions (tenant_id, provider, status, amount, currency)
+        VALUES ($1, 'internal', 'debit', $2, 'CREDIT')
+    """, tenant_id, cost)
+    print(f"💰 Debited {cost} credits from {tenant_id}")
     return True
\ No newline at end of file
@@ -10,3 +10,28 @@ FOOTER_KEYWORDS = [
 TOTAL_KEYWORDS = ["TOTAL", "Total"]
 
 OCR_CONFIDENCE_THRESHOLD = 70
+
+# Header words that identify each table column (canonical key -> aliases)
+COLUMN_SYNONYMS = {
+    "name": ["client", "customer", "name", "patient"],
+    "telephone": ["telephone", "phone", "tel"],
+    "service": ["description", "item", "product", "service", "details"],
+    "amount": ["price", "total", "cost", "amount", "charge"],
+    "sign": ["sign", "signature"]
+}
+
+# Line classification (parser/classifier.py). Substring matches on the lower-cased line.
+# Tenants can extend any list with a "keywords" section in their correction memory.
+HEADER_KEYWORDS = {
+    "name": ["name", "client", "customer"],
+    "service": ["service", "description", "item", "product"],
+    "amount": ["amount", "price", "total", "cost"],
+    "telephone": ["telephone", "phone", "tel"],
+    "sign": ["sign", "signature"]
+}
+HEADER_MIN_COLUMNS = 2                 # header line = at least this many column groups matched
+ROW_STOP_KEYWORDS = ["total", "subtotal", "tax", "amount due"]   # end of the item table
+SIGNATURE_KEYWORDS = ["requested", "approved", "authorized"]     # footer labels
+
+# Tesseract character whitelist for numeric cells in cell-level OCR
+AMOUNT_CHAR_WHITELIST = "0123456789,."
@@ -0,0 +1,92 @@
+#database/async_connection.py
+import os
+import json
+import time
+import asyncio
+from contextlib import asynccontextmanager
+
+import asyncpg
+
+from database.connection import DATABASE_URL
+
+# --- POOL CONFIGURATION ---
+# Used by the async API routes; workers keep the psycopg2 pool in database/connection.py.
+DB_ASYNC_POOL_MIN = int(os.getenv("DB_ASYNC_POOL_MIN", "2"))
+DB_ASYNC_POOL_MAX = int(os.getenv("DB_ASYNC_POOL_MAX", "10"))
+DB_ASYNC_POOL_TIMEOUT = float(os.getenv("DB_ASYNC_POOL_TIMEOUT", "10"))
+DB_ASYNC_MAX_LIFETIME = float(os.getenv("DB_ASYNC_MAX_LIFETIME", "1800"))   # seconds idle before a connection is closed
+
+_pool = None
+_pool_lock = asyncio.Lock()
+_stats = {"checkouts": 0, "wait_ms_total": 0.0, "wait_ms_max": 0.0, "timeouts": 0}
+
+
+async def _init_connection(conn):
+    # Decode json/jsonb columns the same way psycopg2 does
+    for name in ("json", "jsonb"):
+        await conn.set_type_codec(name, encoder=json.dumps, decoder=json.loads, schema="pg_catalog")
+
+
+async def init_async_pool():
+    """Creates the pool. Called from the FastAPI lifespan; safe to call twice."""
+    global _pool
+    async with _pool_lock:
+        if _pool is None:
+            _pool = await asyncpg.create_pool(
+                DATABASE_URL,
+                min_size=DB_ASYNC_POOL_MIN,
+                max_size=DB_ASYNC_POOL_MAX,
+                max_inactive_connection_lifetime=DB_ASYNC_MAX_LIFETIME,
+                init=_init_connection
+            )
+    return _pool
+
+
+async def close_async_pool():
+    global _pool
+    if _pool is not None:
+        await _pool.close()
+        _pool = None
+
+
+@asynccontextmanager
+async def get_async_db():
+    """
+    Borrows a connection from the asyncpg pool:
+        async with get_async_db() as conn:
+            row = await conn.fetchrow("SELECT ... WHERE id = $1", job_id)
+    Wrap multi-statement writes in `async with conn.transaction():`.
+    """
+    pool = _pool or await init_async_pool()
+    start = time.monotonic()
+    try:
+        conn = await pool.acquire(timeout=DB_ASYNC_POOL_TIMEOUT)
+    except asyncio.TimeoutError:
+        _stats["timeouts"] += 1
+        raise
+    wait_ms = (time.monotonic() - start) * 1000
+    _stats["checkouts"] += 1
+    _stats["wait_ms_total"] += wait_ms
+    _stats["wait_ms_max"] = max(_stats["wait_ms_max"], wait_ms)
+    try:
+        yield conn
+    finally:
+        await pool.release(conn)
+
+
+def record_to_dict(record):
+    """asyncpg Records are not JSON-serializable; routes return plain dicts."""
+    return dict(record) if record is not None else None
+
+
+def get_async_pool_stats():
+    stats = dict(_stats)
+    checkouts = stats["checkouts"] or 1
+    stats["wait_ms_avg"] = round(stats["wait_ms_total"] / checkouts, 3)
+    stats["wait_ms_total"] = round(stats["wait_ms_total"], 3)
+    stats["wait_ms_max"] = round(stats["wait_ms_max"], 3)
+    stats["max_size"] = DB_ASYNC_POOL_MAX
+    if _pool is not None:
+        stats["open"] = _pool.get_size()
+        stats["idle"] = _pool.get_idle_size()
+    return stats
@@ -1,5 +1,8 @@
 #database/connection
 import os
+import time
+import threading
+from contextlib import contextmanager
 import psycopg2
 from urllib.parse import quote_plus  # <--- Add this import
 from psycopg2.extras import RealDictCursor
@@ -21,9 +24,185 @@ safe_password = quote_plus(DB_PASS) if DB_PASS else ""
 DATABASE_URL = f"postgresql://{DB_USER}:{safe_password}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
 # -----------------
 
-def get_db():
-    """Returns a connection to the Postgres database."""
+# --- POOL CONFIGURATION ---
+# The API serves many short requests; each worker process mostly holds one connection.
+DB_POOL_ROLE = os.getenv("DB_POOL_ROLE", "api")
+DB_POOL_SIZES = {
+    "api": int(os.getenv("DB_POOL_MAX_API", "10")),
+    "worker": int(os.getenv("DB_POOL_MAX_WORKER", "2")),
+}
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))                  # seconds to wait for a free connection
+DB_POOL_MAX_LIFETIME = float(os.getenv("DB_POOL_MAX_LIFETIME", "1800"))      # recycle connections older than this
+DB_POOL_CHECK_IDLE = float(os.getenv("DB_POOL_CHECK_IDLE", "30"))            # ping connections idle longer than this
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection frees up within DB_POOL_TIMEOUT."""
+
+
+def _connect():
     return psycopg2.connect(
         DATABASE_URL,
         cursor_factory=RealDictCursor
-    )
\ No newline at end of file
+    )
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of psycopg2 connections for one process.
+    Connections are opened lazily up to `max_size`; callers beyond that wait.
+    """
+
+    def __init__(self, max_size, timeout=DB_POOL_TIMEOUT,
+                 max_lifetime=DB_POOL_MAX_LIFETIME, check_idle=DB_POOL_CHECK_IDLE):
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.check_idle = check_idle
+        self._idle = []          # [(conn, created_at, returned_at)], most recent last
+        self._open = 0           # idle + checked out
+        self._cond = threading.Condition()
+        self._stats = {
+            "checkouts": 0, "waits": 0, "wait_ms_total": 0.0, "wait_ms_max": 0.0,
+            "timeouts": 0, "opened": 0, "recycled": 0, "failed_checks": 0
+        }
+
+    def _healthy(self, conn, created_at, returned_at):
+        """Drops closed or expired connections and pings ones that sat idle for a while."""
+        now = time.monotonic()
+        if conn.closed or now - created_at > self.max_lifetime:
+            self._stats["recycled"] += 1
+            return False
+        if now - returned_at > self.check_idle:
+            try:
+                with conn.cursor() as cur:
+                    cur.execute("SELECT 1")
+                conn.rollback()
+            except psycopg2.Error:
+                self._stats["failed_checks"] += 1
+                return False
+        return True
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except psycopg2.Error:
+            pass
+
+    def acquire(self):
+        """Returns (conn, created_at). Blocks up to `timeout` when the pool is exhausted."""
+        start = time.monotonic()
+        waited = False
+        with self._cond:
+            while True:
+                # 1. Reuse an idle connection if it is still good
+                while self._idle:
+                    conn, created_at, returned_at = self._idle.pop()
+                    if self._healthy(conn, created_at, returned_at):
+                        self._record_checkout(start, waited)
+                        return conn, created_at
+                    self._open -= 1
+                    self._discard(conn)
+
+                # 2. Room for a new one: open it outside the lock
+                if self._open < self.max_size:
+                    self._open += 1
+                    break
+
+                # 3. Exhausted: wait for a release
+                remaining = self.timeout - (time.monotonic() - start)
+                if remaining <= 0:
+                    self._stats["timeouts"] += 1
+                    raise PoolTimeout(f"No database connection available after {self.timeout}s")
+                waited = True
+                self._cond.wait(remaining)
+
+        try:
+            conn = _connect()
+        except Exception:
+            with self._cond:
+                self._open -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self._stats["opened"] += 1
+            self._record_checkout(start, waited)
+        return conn, time.monotonic()
+
+    def _record_checkout(self, start, waited):
+        wait_ms = (time.monotonic() - start) * 1000
+        self._stats["checkouts"] += 1
+        if waited:
+            self._stats["waits"] += 1
+        self._stats["wait_ms_total"] += wait_ms
+        self._stats["wait_ms_max"] = max(self._stats["wait_ms_max"], wait_ms)
+
+    def release(self, conn, created_at, broken=False):
+        with self._cond:
+            if broken or conn.closed or conn.status != psycopg2.extensions.STATUS_READY:
+                self._open -= 1
+                self._discard(conn)
+            else:
+                self._idle.append((conn, created_at, time.monotonic()))
+            self._cond.notify()
+
+    def stats(self):
+        with self._cond:
+            stats = dict(self._stats)
+            stats["max_size"] = self.max_size
+            stats["open"] = self._open
+            stats["idle"] = len(self._idle)
+            stats["in_use"] = self._open - len(self._idle)
+        checkouts = stats["checkouts"] or 1
+        stats["wait_ms_avg"] = round(stats["wait_ms_total"] / checkouts, 3)
+        stats["wait_ms_total"] = round(stats["wait_ms_total"], 3)
+        stats["wait_ms_max"] = round(stats["wait_ms_max"], 3)
+        return stats
+
+
+# One pool per process: connections must never be shared across fork()
+_pools = {}
+_pools_lock = threading.Lock()
+
+def set_pool_role(role):
+    """Call before the first query, e.g. set_pool_role("worker") in worker entry points."""
+    global DB_POOL_ROLE
+    if role not in DB_POOL_SIZES:
+        raise ValueError(f"Unknown pool role: {role}")
+    DB_POOL_ROLE = role
+    os.environ["DB_POOL_ROLE"] = role   # inherited by spawned child processes
+
+def get_pool():
+    pid = os.getpid()
+    pool = _pools.get(pid)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(pid)
+            if pool is None:
+                pool = _pools[pid] = ConnectionPool(DB_POOL_SIZES[DB_POOL_ROLE])
+    return pool
+
+def get_pool_stats():
+    """Checkout/wait counters of this process's pool."""
+    stats = get_pool().stats()
+    stats["role"] = DB_POOL_ROLE
+    return stats
+
+@contextmanager
+def get_db():
+    """
+    Borrows a pooled connection to the Postgres database.
+    Same contract as before: `with get_db() as conn:` commits on success
+    and rolls back on error; the connection then goes back to the pool.
+    """
+    pool = get_pool()
+    conn, created_at = pool.acquire()
+    broken = False
+    try:
+        with conn:
+            yield conn
+    except (psycopg2.OperationalError, psycopg2.InterfaceError):
+        broken = True
+        raise
+    finally:
+        pool.release(conn, created_at, broken)
\ No newline at end of file
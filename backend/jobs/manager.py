@@ -1,17 +1,19 @@
 import uuid
+import json
 import psycopg2
 from psycopg2.extras import RealDictCursor
 from database.connection import get_db
+from database.async_connection import get_async_db, record_to_dict
 
 # Import the professional billing logic we unified earlier
-from billing.service import debit_credits_for_job
+from billing.service import debit_credits_for_job, debit_credits_for_job_async
 from billing.exceptions import BillingError
 
 # --- CONFIGURATION ---
 # Prevents one user from saturating all workers
 MAX_CONCURRENT_PER_TENANT = 3
 
-def create_job(tenant_id: str, input_path: str, priority: int = 1):
+def create_job(tenant_id: str, input_path: str, priority: int = 1, content_hash: str = None):
     """
     1. Validates and DEDUCTS credits using the Billing Service.
     2. Inserts job into the queue only if payment/credits are successful.
@@ -34,13 +36,37 @@ def create_job(tenant_id: str, input_path: str, priority: int = 1):
     with get_db() as conn:
         with conn.cursor() as cur:
             cur.execute("""
-                INSERT INTO jobs (id, tenant_id, status, input_path, priority, created_at)
-                VALUES (%s, %s, %s, %s, %s, CURRENT_TIMESTAMP)
-            """, (job_id, tenant_id, "PENDING", input_path, priority))
+                INSERT INTO jobs (id, tenant_id, status, input_path, priority, content_hash, created_at)
+                VALUES (%s, %s, %s, %s, %s, %s, CURRENT_TIMESTAMP)
+            """, (job_id, tenant_id, "PENDING", input_path, priority, content_hash))
             conn.commit()
 
     return job_id
 
+async def create_job_async(tenant_id: str, input_path: str, priority: int = 1, content_hash: str = None):
+    """
+    Async create_job for the API routes: the credit debit and the job insert
+    run in one transaction, so a failed insert never costs the tenant credits.
+    (The sync create_job stays for scripts and workers.)
+    """
+    job_id = str(uuid.uuid4())
+
+    async with get_async_db() as conn:
+        async with conn.transaction():
+            # 🔒 PHASE 1: BILLING ENFORCEMENT
+            try:
+                await debit_credits_for_job_async(conn, tenant_id)
+            except BillingError as e:
+                raise Exception(f"Billing Validation Failed: {str(e)}")
+
+            # 🛠️ PHASE 2: JOB CREATION
+            await conn.execute("""
+                INSERT INTO jobs (id, tenant_id, status, input_path, priority, content_hash, created_at)
+                VALUES ($1, $2, $3, $4, $5, $6, CURRENT_TIMESTAMP)
+            """, job_id, tenant_id, "PENDING", input_path, priority, content_hash)
+
+    return job_id
+
 def claim_next_job():
     """
     High-Performance Fair Scheduler:
@@ -69,14 +95,14 @@ def claim_next_job():
                         LIMIT 1
                         FOR UPDATE SKIP LOCKED
                     )
-                    RETURNING id, input_path, tenant_id
+                    RETURNING id, input_path, tenant_id, content_hash
                 """, (MAX_CONCURRENT_PER_TENANT,))
                 
                 claimed = cur.fetchone()
                 conn.commit()
                 
                 if claimed:
-                    return (str(claimed['id']), claimed['input_path'], claimed['tenant_id'])
+                    return (str(claimed['id']), claimed['input_path'], claimed['tenant_id'], claimed['content_hash'])
                 return None
 
             except Exception as e:
@@ -98,9 +124,65 @@ def update_job_status(job_id: str, status: str, output_path: str = None, error:
             """, (status, output_path, error, job_id))
             conn.commit()
 
+def record_job_stats(job_id: str, stats: dict):
+    """Stores per-job pipeline data (scaling decisions, etc.) for later tuning."""
+    with get_db() as conn:
+        with conn.cursor() as cur:
+            cur.execute("""
+                UPDATE jobs
+                SET pipeline_stats = %s
+                WHERE id = %s
+            """, (json.dumps(stats), job_id))
+            conn.commit()
+
+def save_job_result(job_id: str, tenant_id: str, result: dict):
+    """Stores the structured output of a job (rows, footer, status, reasons); replaces it on retry."""
+    with get_db() as conn:
+        with conn.cursor() as cur:
+            cur.execute("""
+                INSERT INTO job_results
+                    (job_id, tenant_id, status, company_name, line_items, footer, review_reasons, row_count)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+                ON CONFLICT (job_id) DO UPDATE SET
+                    status = EXCLUDED.status,
+                    company_name = EXCLUDED.company_name,
+                    line_items = EXCLUDED.line_items,
+                    footer = EXCLUDED.footer,
+                    review_reasons = EXCLUDED.review_reasons,
+                    row_count = EXCLUDED.row_count,
+                    updated_at = CURRENT_TIMESTAMP
+            """, (
+                job_id, tenant_id, result["status"], result["company_name"],
+                json.dumps(result["rows"]), json.dumps(result["footer"]),
+                json.dumps(result["review_reasons"]), len(result["rows"])
+            ))
+            conn.commit()
+
+def get_job_result(job_id: str):
+    """
+    The stored result of a job, or None if there is none to hand out.
+    The result is saved before billing runs, so it only counts once the job
+    reached COMPLETED or REVIEW_REQUIRED (not FAILED for lack of credits).
+    """
+    with get_db() as conn:
+        with conn.cursor(cursor_factory=RealDictCursor) as cur:
+            cur.execute("""
+                SELECT r.* FROM job_results r
+                JOIN jobs j ON j.id = r.job_id
+                WHERE r.job_id = %s
+                  AND j.status IN ('COMPLETED', 'REVIEW_REQUIRED')
+            """, (job_id,))
+            return cur.fetchone()
+
 def get_job(job_id: str):
     """Retrieves the full record for a specific job."""
     with get_db() as conn:
         with conn.cursor(cursor_factory=RealDictCursor) as cur:
             cur.execute("SELECT * FROM jobs WHERE id = %s", (job_id,))
-            return cur.fetchone()
\ No newline at end of file
+            return cur.fetchone()
+
+async def get_job_async(job_id: str):
+    """Async get_job for the API routes."""
+    async with get_async_db() as conn:
+        row = await conn.fetchrow("SELECT * FROM jobs WHERE id = $1", job_id)
+        return record_to_dict(row)
\ No newline at end of file
@@ -1,7 +1,7 @@
 #jobs/sla_worker.py
 import time
 import logging
-from database.connection import get_db
+from database.connection import get_db, set_pool_role
 from metrics.tenant import get_tenant_metrics
 from sla.evaluator import evaluate_sla
 from sla.enforcer import apply_sla_result
@@ -35,4 +35,5 @@ def run_sla_worker():
         time.sleep(CHECK_INTERVAL_SECONDS)
 
 if __name__ == "__main__":
+    set_pool_role("worker")
     run_sla_worker()
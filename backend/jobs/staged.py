@@ -0,0 +1,285 @@
+#jobs/staged.py
+import os
+import time
+import queue
+import logging
+import multiprocessing
+from pathlib import Path
+from multiprocessing import shared_memory, resource_tracker
+
+import numpy as np
+
+from jobs.manager import claim_next_job
+from main import iter_preprocessed_pages, lookup_cached, stream_pages, finish_pipeline
+from ocr.regions import extract_page_ocr_data
+from ocr.cache import cache_ocr, cache_parse
+from metrics.timing import timed, merge_timings
+
+logger = logging.getLogger("StagedExecutor")
+
+# --- CONFIGURATION ---
+# Each stage gets its own processes so a job writing Excel never holds an OCR core.
+CPU_COUNT = multiprocessing.cpu_count()
+STAGE_PREPROCESS_PROCS = int(os.getenv("STAGE_PREPROCESS_PROCS", max(1, CPU_COUNT // 4)))
+STAGE_OCR_PROCS = int(os.getenv("STAGE_OCR_PROCS", max(1, CPU_COUNT // 2)))
+STAGE_RENDER_PROCS = int(os.getenv("STAGE_RENDER_PROCS", max(1, CPU_COUNT // 4)))
+STAGE_QUEUE_SIZE = int(os.getenv("STAGE_QUEUE_SIZE", "8"))   # pages/jobs waiting per stage
+# A job with no news for this long is failed (and retried): a stage process died holding it
+STAGE_JOB_TIMEOUT_SECONDS = float(os.getenv("STAGE_JOB_TIMEOUT_SECONDS", "600"))
+DEPTH_LOG_SECONDS = 30
+
+
+# -----------------------------
+# SHARED-MEMORY IMAGE HAND-OFF
+# -----------------------------
+
+def _put_image(image):
+    """Copies a page into a new shared-memory block and returns its descriptor."""
+    shm = shared_memory.SharedMemory(create=True, size=max(image.nbytes, 1))
+    np.ndarray(image.shape, dtype=image.dtype, buffer=shm.buf)[...] = image
+    descriptor = {"shm": shm.name, "shape": image.shape, "dtype": str(image.dtype)}
+    # Ownership moves to the OCR stage, which unlinks the block when done
+    resource_tracker.unregister(shm._name, "shared_memory")
+    shm.close()
+    return descriptor
+
+
+def _take_image(descriptor):
+    """Attaches to a page block. The caller must close() and unlink() the block."""
+    shm = shared_memory.SharedMemory(name=descriptor["shm"])
+    image = np.ndarray(descriptor["shape"], dtype=descriptor["dtype"], buffer=shm.buf)
+    return shm, image
+
+
+# -----------------------------
+# STAGE WORKERS
+# -----------------------------
+
+def preprocess_stage(in_q, ocr_q, hub_q):
+    """Decode + deskew + normalize + threshold. Cache hits skip straight to the hub."""
+    while True:
+        job = in_q.get()
+        if job is None:
+            break
+        try:
+            image_path = Path(job["input_path"])
+            if not image_path.exists():
+                raise FileNotFoundError(f"Input image not found: {image_path}")
+
+            cached = lookup_cached(image_path, job["tenant_id"], job["content_hash"])
+            job["content_hash"] = cached["content_hash"]
+            job["memory_version"] = cached["memory_version"]
+            if cached["parsed"] or cached["pages"] is not None:
+                hub_q.put({"type": "cached", "job": job, "parsed": cached["parsed"], "pages": cached["pages"]})
+                continue
+
+            page_stats = []
+            for page_num, page_count, cleaned in iter_preprocessed_pages(image_path, page_stats):
+                # Blocks when the OCR stage is saturated (backpressure)
+                ocr_q.put({
+                    "job": job, "page": page_num, "page_count": page_count,
+                    "image": _put_image(cleaned), "stats": page_stats[-1]
+                })
+
+            # No pages means no OCR message would ever reach the hub for this job
+            if not page_stats:
+                raise ValueError(f"No pages found in: {image_path.name}")
+        except Exception as e:
+            hub_q.put({"type": "error", "job": job, "error": str(e)})
+
+
+def ocr_stage(ocr_q, hub_q):
+    """Tesseract only. Pages arrive through shared memory, tokens leave through the hub."""
+    while True:
+        msg = ocr_q.get()
+        if msg is None:
+            break
+        shm, image = _take_image(msg["image"])
+        try:
+            with timed(msg["stats"], "ocr", pixels=image.size):
+                ocr_data = extract_page_ocr_data(image)
+            hub_q.put({
+                "type": "page", "job": msg["job"], "page": msg["page"],
+                "page_count": msg["page_count"], "ocr_data": ocr_data, "stats": msg["stats"]
+            })
+        except Exception as e:
+            hub_q.put({"type": "error", "job": msg["job"], "error": str(e)})
+        finally:
+            del image
+            shm.close()
+            shm.unlink()
+
+
+def render_stage(render_q, hub_q):
+    """Parse + memory fixes + review (Excel is rendered on download)."""
+    while True:
+        msg = render_q.get()
+        if msg is None:
+            break
+        job = msg["job"]
+        stats = {}
+        try:
+            if msg.get("parsed"):
+                rows, footer = msg["parsed"]["rows"], msg["parsed"]["footer"]
+            else:
+                if msg.get("fresh"):
+                    cache_ocr(job["content_hash"], msg["pages"])
+                rows, footer = stream_pages(msg["pages"], job["tenant_id"], stats)
+
+            kept = []
+            result = finish_pipeline(job["input_path"], rows, footer, job["tenant_id"], stats, kept=kept)
+            if kept and not msg.get("parsed"):
+                cache_parse(job["content_hash"], job["tenant_id"], job["memory_version"], kept, footer)
+            hub_q.put({"type": "done", "job": job, "result": result, "stats": stats})
+        except Exception as e:
+            hub_q.put({"type": "error", "job": job, "error": str(e)})
+
+
+# -----------------------------
+# EXECUTOR (runs in the parent process)
+# -----------------------------
+
+class StagedExecutor:
+    """
+    Claims jobs and moves them through three process pools connected by bounded queues:
+        preprocess --(shared memory)--> OCR --(tokens)--> hub --(pages)--> parse+render
+    The hub (this process) reassembles multi-page jobs and finalizes results.
+    """
+
+    def __init__(self, finalize, fail,
+                 preprocess_procs=STAGE_PREPROCESS_PROCS,
+                 ocr_procs=STAGE_OCR_PROCS,
+                 render_procs=STAGE_RENDER_PROCS,
+                 queue_size=STAGE_QUEUE_SIZE):
+        self.finalize = finalize      # finalize(job_id, tenant_id, result, stats)
+        self.fail = fail              # fail(job_id, error)
+        self.pool_sizes = {"preprocess": preprocess_procs, "ocr": ocr_procs, "render": render_procs}
+
+        self.preprocess_q = multiprocessing.Queue(maxsize=queue_size)
+        self.ocr_q = multiprocessing.Queue(maxsize=queue_size)
+        self.render_q = multiprocessing.Queue(maxsize=queue_size)
+        self.hub_q = multiprocessing.Queue()
+
+        # Never claim more jobs than the pipeline can hold, or they sit in queues
+        # long enough for the janitor to consider them stuck.
+        self.max_in_flight = preprocess_procs + ocr_procs + render_procs + queue_size
+        self.in_flight = {}   # job_id -> {"pages": {}, "claimed_at": float, "updated_at": float, "stats": {...}}
+        self.processes = []   # [(name, target, args, process)]
+
+    def queue_depths(self):
+        return {
+            "preprocess": self.preprocess_q.qsize(),
+            "ocr": self.ocr_q.qsize(),
+            "render": self.render_q.qsize(),
+            "hub": self.hub_q.qsize(),
+            "in_flight_jobs": len(self.in_flight)
+        }
+
+    def _spawn(self, name, target, args):
+        p = multiprocessing.Process(target=target, args=args, name=name)
+        p.daemon = True
+        p.start()
+        return p
+
+    def start(self):
+        stages = [
+            ("preprocess", preprocess_stage, (self.preprocess_q, self.ocr_q, self.hub_q)),
+            ("ocr", ocr_stage, (self.ocr_q, self.hub_q)),
+            ("render", render_stage, (self.render_q, self.hub_q)),
+        ]
+        for stage, target, args in stages:
+            for i in range(self.pool_sizes[stage]):
+                name = f"{stage}-{i+1}"
+                self.processes.append((name, target, args, self._spawn(name, target, args)))
+        logger.info(f"🏗️ Staged executor started: {self.pool_sizes}")
+
+    def _restart_dead_stages(self):
+        """Replaces stage processes that died (OOM kill, segfault in Tesseract...)."""
+        for i, (name, target, args, p) in enumerate(self.processes):
+            if not p.is_alive():
+                logger.warning(f"⚠️ Stage process {name} exited (code {p.exitcode}); restarting it.")
+                self.processes[i] = (name, target, args, self._spawn(name, target, args))
+
+    def _expire_stale_jobs(self):
+        """Fails jobs that have not moved for STAGE_JOB_TIMEOUT_SECONDS, freeing their slots."""
+        now = time.perf_counter()
+        for job_id, state in list(self.in_flight.items()):
+            if now - state["updated_at"] > STAGE_JOB_TIMEOUT_SECONDS:
+                del self.in_flight[job_id]
+                self.fail(job_id, f"No progress in the staged pipeline for {STAGE_JOB_TIMEOUT_SECONDS:.0f}s")
+
+    def stop(self):
+        for name, q in [("preprocess", self.preprocess_q), ("ocr", self.ocr_q), ("render", self.render_q)]:
+            for _ in range(self.pool_sizes[name]):
+                q.put(None)
+        for _, _, _, p in self.processes:
+            p.join(timeout=10)
+
+    def _submit_new_jobs(self):
+        while len(self.in_flight) < self.max_in_flight and not self.preprocess_q.full():
+            claimed = claim_next_job()
+            if not claimed:
+                return
+            job_id, input_path, tenant_id, content_hash = claimed
+            now = time.perf_counter()
+            self.in_flight[job_id] = {
+                "pages": {},
+                "claimed_at": now,
+                "updated_at": now,
+                "stats": {"pages": [], "queue_depth_at_claim": self.queue_depths()}
+            }
+            self.preprocess_q.put({
+                "job_id": job_id, "input_path": input_path,
+                "tenant_id": tenant_id, "content_hash": content_hash
+            })
+            logger.info(f"📦 Staged executor claimed job {job_id} (Tenant: {tenant_id})")
+
+    def _handle(self, msg):
+        job = msg["job"]
+        state = self.in_flight.get(job["job_id"])
+        if state is None:
+            return  # Job already failed on another page (or timed out)
+        state["updated_at"] = time.perf_counter()
+
+        if msg["type"] == "error":
+            del self.in_flight[job["job_id"]]
+            self.fail(job["job_id"], msg["error"])
+
+        elif msg["type"] == "cached":
+            self.render_q.put({"job": job, "parsed": msg["parsed"], "pages": msg["pages"]})
+
+        elif msg["type"] == "page":
+            state["pages"][msg["page"]] = msg["ocr_data"]
+            state["stats"]["pages"].append(msg["stats"])
+            merge_timings(state["stats"], msg["stats"])
+            if len(state["pages"]) == msg["page_count"]:
+                pages = [state["pages"][n] for n in sorted(state["pages"])]
+                state["pages"] = {}
+                self.render_q.put({"job": job, "pages": pages, "fresh": True})
+
+        elif msg["type"] == "done":
+            del self.in_flight[job["job_id"]]
+            merge_timings(state["stats"], msg["stats"])
+            state["stats"]["total_ms"] = round((time.perf_counter() - state["claimed_at"]) * 1000, 3)
+            self.finalize(job["job_id"], job["tenant_id"], msg["result"], state["stats"])
+
+    def run_forever(self):
+        self.start()
+        last_depth_log = 0
+        try:
+            while True:
+                self._submit_new_jobs()
+                try:
+                    self._handle(self.hub_q.get(timeout=1))
+                except queue.Empty:
+                    pass
+
+                if time.time() - last_depth_log > DEPTH_LOG_SECONDS:
+                    self._restart_dead_stages()
+                    self._expire_stale_jobs()
+                    logger.info(f"📊 Stage queue depths: {self.queue_depths()}")
+                    last_depth_log = time.time()
+        except KeyboardInterrupt:
+            logger.info("🛑 Shutting down staged executor...")
+        finally:
+            self.stop()
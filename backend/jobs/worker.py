@@ -4,8 +4,8 @@ import sys
 import multiprocessing
 import os
 from datetime import datetime, timedelta
-from database.connection import get_db
-from jobs.manager import claim_next_job, update_job_status
+from database.connection import get_db, set_pool_role
+from jobs.manager import claim_next_job, update_job_status, record_job_stats, save_job_result
 # Updated to use your new dynamic deduction function
 from billing.manager import deduct_credits_for_job  
 from main import run_pipeline as process_invoice  
@@ -81,6 +81,51 @@ def handle_failure(job_id, error_message, worker_name):
 # WORKER EXECUTION LOGIC
 # -----------------------------
 
+def finalize_job(job_id, tenant_id, result, stats, worker_name):
+    """Bills and records the outcome of a pipeline run (shared by both worker modes)."""
+    status, _, job_result = result
+
+    # 1. Nothing was read: there is no result to review or download
+    if not job_result:
+        logger.error(f"❌ {worker_name}: Job {job_id} produced no invoice rows.")
+        update_job_status(job_id, "FAILED", error="No invoice rows could be read from the document.")
+        store_job_stats(job_id, stats, worker_name)
+        return
+
+    # Persist the structured result; downloads render Excel/CSV/JSON from it
+    save_job_result(job_id, tenant_id, job_result)
+
+    # 2. Determine final status
+    # Only charge if the OCR was successful
+    if status in ["OK", "AUTO_FIXED"]:
+        
+        # 3. Dynamic Billing Integration
+        # This automatically fetches the cost (30, 50, etc.) from the plan
+        charged = deduct_credits_for_job(tenant_id, job_id)
+        
+        if charged:
+            logger.info(f"💰 {worker_name}: Successfully deducted credits for {job_id}")
+            update_job_status(job_id, "COMPLETED")
+        else:
+            # Fail job if the tenant ran out of credits during processing
+            logger.warning(f"⚠️ {worker_name}: Insufficient credits for {tenant_id}")
+            update_job_status(job_id, "FAILED", error="Insufficient credits to complete job.")
+    
+    else:
+        # Job finished but needs review (No charge yet, or per your policy)
+        update_job_status(job_id, "REVIEW_REQUIRED")
+        logger.info(f"🔍 {worker_name}: Job {job_id} requires manual review.")
+
+    store_job_stats(job_id, stats, worker_name)
+
+def store_job_stats(job_id, stats, worker_name):
+    # Tuning data is best-effort: never fail a job because of it
+    if stats:
+        try:
+            record_job_stats(job_id, stats)
+        except Exception as e:
+            logger.warning(f"⚠️ {worker_name}: Could not store stats for {job_id}: {e}")
+
 def run_worker(worker_name="worker-1"):
     """
     Continuous loop to claim and process jobs from Postgres.
@@ -92,37 +137,21 @@ def run_worker(worker_name="worker-1"):
         job = claim_next_job()
 
         if job:
-            job_id, input_path, tenant_id = job
+            job_id, input_path, tenant_id, content_hash = job
             logger.info(f"📦 {worker_name} claimed job {job_id} (Tenant: {tenant_id})")
 
+            stats = {}
             try:
                 # 1. Run the OCR Engine
-                status, _, final_excel_path = process_invoice(input_path, tenant_id=tenant_id)
-
-                # 2. Determine final status
-                # Only charge if the OCR was successful
-                if status in ["OK", "AUTO_FIXED"]:
-                    
-                    # 3. Dynamic Billing Integration
-                    # This automatically fetches the cost (30, 50, etc.) from the plan
-                    charged = deduct_credits_for_job(tenant_id, job_id)
-                    
-                    if charged:
-                        logger.info(f"💰 {worker_name}: Successfully deducted credits for {job_id}")
-                        update_job_status(job_id, "COMPLETED", output_path=str(final_excel_path))
-                    else:
-                        # Fail job if the tenant ran out of credits during processing
-                        logger.warning(f"⚠️ {worker_name}: Insufficient credits for {tenant_id}")
-                        update_job_status(job_id, "FAILED", error="Insufficient credits to complete job.")
-                
-                else:
-                    # Job finished but needs review (No charge yet, or per your policy)
-                    update_job_status(job_id, "REVIEW_REQUIRED", output_path=str(final_excel_path))
-                    logger.info(f"🔍 {worker_name}: Job {job_id} requires manual review.")
+                result = process_invoice(
+                    input_path, tenant_id=tenant_id, content_hash=content_hash, stats=stats
+                )
+                finalize_job(job_id, tenant_id, result, stats, worker_name)
 
             except Exception as e:
                 logger.error(f"⚠️ {worker_name}: Pipeline error on job {job_id}: {str(e)}")
                 handle_failure(job_id, str(e), worker_name)
+                store_job_stats(job_id, stats, worker_name)
         else:
             time.sleep(1)
 
@@ -148,5 +177,33 @@ def start_worker_pool():
     except KeyboardInterrupt:
         logger.info("🛑 Shutting down worker pool...")
 
+def start_staged_workers():
+    """
+    Pipelined mode: separate process pools for preprocess, OCR and parse+render.
+    Pool sizes come from STAGE_PREPROCESS_PROCS / STAGE_OCR_PROCS / STAGE_RENDER_PROCS.
+    """
+    from jobs.staged import StagedExecutor
+
+    reset_stuck_jobs(timeout_minutes=10)
+    worker_name = "staged"
+
+    def finalize(job_id, tenant_id, result, stats):
+        try:
+            finalize_job(job_id, tenant_id, result, stats, worker_name)
+        except Exception as e:
+            logger.error(f"⚠️ {worker_name}: Finalize error on job {job_id}: {str(e)}")
+            handle_failure(job_id, str(e), worker_name)
+
+    def fail(job_id, error):
+        logger.error(f"⚠️ {worker_name}: Pipeline error on job {job_id}: {error}")
+        handle_failure(job_id, error, worker_name)
+
+    StagedExecutor(finalize=finalize, fail=fail).run_forever()
+
 if __name__ == "__main__":
-    start_worker_pool()
\ No newline at end of file
+    # Usage: python -m jobs.worker [--staged]
+    set_pool_role("worker")
+    if "--staged" in sys.argv:
+        start_staged_workers()
+    else:
+        start_worker_pool()
\ No newline at end of file
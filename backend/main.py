@@ -1,86 +1,284 @@
 import os
 import sys
+import time
+import itertools
 from pathlib import Path
 
 # OCR & Parsing Imports
-from ocr.preprocess import preprocess_image
-from ocr.tesseract_ocr import extract_ocr_data
+from ocr.preprocess import preprocess_image, preprocess_array
+from ocr.regions import extract_page_ocr_data
 from ocr.layout import group_words_into_lines
+from ocr.pdf import iter_pdf_ocr_data, iter_pdf_pages, count_pdf_pages
+from ocr.cache import get_cached_ocr, cache_ocr, get_cached_parse, cache_parse, cache_stats
+from storage.cache import sha256_file
+from parser.classifier import get_line_classifier
 from parser.header import detect_table_header
-from parser.table import parse_table, parse_implicit_table
+from parser.table import iter_table_rows, iter_implicit_table_rows, iter_grid_table_rows, header_columns
+from parser.templates import LAYOUT_TEMPLATES, match_template, learn_template, save_template
 from parser.footer import extract_footer
-from output.excel_writer import write_excel
-from review.invoice_review import evaluate_invoice
+from review.invoice_review import InvoiceEvaluator
+from memory.corrections import get_compiled_memory
+from metrics.timing import timed, timed_iter, record_timing, merge_timings, stage_ms
 
 # Logic & Memory Imports (Commented out until fully implemented)
 # from parser.review import assign_review_status 
-# from memory.corrections import load_memory, apply_known_fixes
+# from memory.corrections import load_memory
 
 # --- PATH CONFIGURATION ---
 # Internal storage for the engine before the worker moves files to tenant folders
 TEMP_PROCESSING_DIR = Path("runtime/temp_processing")
 TEMP_PROCESSING_DIR.mkdir(parents=True, exist_ok=True)
 
-def run_pipeline(image_path, tenant_id="default_tenant"):
+def run_ocr(image_path, page_stats=None):
+    """Returns the raw Tesseract token data, one dict per page."""
+    if image_path.suffix.lower() == ".pdf":
+        # cv2 cannot decode PDFs: rasterize page by page and OCR pages in parallel
+        return list(iter_pdf_ocr_data(image_path, page_stats=page_stats))
+
+    stats = None
+    if page_stats is not None:
+        stats = {"page": 1}
+        page_stats.append(stats)
+    image = preprocess_image(str(image_path), stats)
+    # Only the table grid and footer band are sent to Tesseract
+    with timed(stats, "ocr", pixels=image.size):
+        return [extract_page_ocr_data(image)]
+
+def iter_preprocessed_pages(image_path, page_stats=None):
     """
-    The Core Engine: Processes a single image and returns metadata + temp file path.
-    Designed to be called by jobs/worker.py.
+    Stage 1 on its own: yields (page_num, page_count, cleaned_image) without OCR.
+    Used by the staged executor (jobs/staged.py), which OCRs pages elsewhere.
     """
-    image_path = Path(image_path)
-    if not image_path.exists():
-        raise FileNotFoundError(f"Input image not found: {image_path}")
+    if image_path.suffix.lower() == ".pdf":
+        page_count = count_pdf_pages(image_path)
+        images = iter_pdf_pages(image_path)
+    else:
+        page_count = 1
+        images = None
 
-    print(f"--- ⚙️ Processing: {image_path.name} (Tenant: {tenant_id}) ---")
+    for page_num in range(1, page_count + 1):
+        stats = None
+        if page_stats is not None:
+            stats = {"page": page_num}
+            page_stats.append(stats)
+        if images is None:
+            cleaned = preprocess_image(str(image_path), stats)
+        else:
+            start = time.perf_counter()
+            image = next(images)
+            record_timing(stats, "decode", (time.perf_counter() - start) * 1000,
+                          pixels=image.shape[0] * image.shape[1], bytes=image.nbytes)
+            cleaned = preprocess_array(image, stats)
+        yield page_num, page_count, cleaned
+
+def lookup_cached(image_path, tenant_id, content_hash=None):
+    """
+    Stage 0: content-addressed cache lookup (duplicate uploads skip OCR entirely).
+    Returns a dict with the hash, the tenant memory version, and whatever was cached.
+    """
+    content_hash = content_hash or sha256_file(image_path)
+    memory_version = get_compiled_memory(tenant_id).version
+    parsed = get_cached_parse(content_hash, tenant_id, memory_version)
+    pages = None if parsed else get_cached_ocr(content_hash)
+    if parsed:
+        print(f"⚡ Cache hit for {content_hash[:12]} | {cache_stats()}")
+    return {"content_hash": content_hash, "memory_version": memory_version, "parsed": parsed, "pages": pages}
+
+def stream_pages(pages, tenant_id="default_tenant", stats=None):
+    """
+    Stage 4 as a stream: returns (rows, footer) where `rows` is a generator.
+    Lines are grouped and classified up front (header and footer search need
+    the whole document); rows are then parsed, memory-fixed and review-scored
+    one at a time as the consumer pulls them.
+    """
+    with timed(stats, "line_grouping", tokens=sum(len(p["text"]) for p in pages)):
+        lines = []
+        for ocr_data in pages:
+            lines.extend(group_words_into_lines(ocr_data))
+
+    # One pass tags every line (header / item / total / signature / noise) for all stages below
+    with timed(stats, "line_classification", lines=len(lines)):
+        tags = get_line_classifier(tenant_id).classify(lines)
+
+    # Ruled tables were already read cell by cell; everything else goes by x-position
+    # (table_parsing includes the memory_fixes time, which is also reported on its own)
+    grids = [ocr_data["grid"] for ocr_data in pages if ocr_data.get("grid")]
+    template = header_index = header_line = None
+    if grids:
+        rows = iter_grid_table_rows(grids, tenant_id=tenant_id, stats=stats)
+        layout = "grid"
+    else:
+        # A known layout skips the keyword header search and the footer scan above it
+        with timed(stats, "header_detection", lines=len(lines)):
+            template, header_index = match_template(lines, tenant_id)
+            if template is None:
+                header_index, header_line = detect_table_header(lines, tags)
+            else:
+                header_line = lines[header_index]
+
+        if header_index is not None:
+            rows = iter_table_rows(lines, header_index, header_line, tenant_id=tenant_id,
+                                   stats=stats, tags=tags, template=template)
+        else:
+            rows = iter_implicit_table_rows(lines, tenant_id=tenant_id, stats=stats, tags=tags)
 
-    # 1-3. OCR Steps
-    image = preprocess_image(str(image_path))
-    ocr_data = extract_ocr_data(image)
-    lines = group_words_into_lines(ocr_data)
+        if template is not None:
+            layout = "hit"
+        elif header_index is not None and LAYOUT_TEMPLATES:
+            layout = "learned"
+        else:
+            layout = "miss"
 
-    # 4. Table Parsing
-    header_index, header_line = detect_table_header(lines)
-    rows = parse_table(lines, header_index, header_line) if header_index else parse_implicit_table(lines)
+    if stats is not None:
+        stats["layout_template"] = layout
+    start = template.footer_start(lines, header_index) if layout == "hit" else 0
+    footer = extract_footer(lines[start:], tags[start:])
 
-    if not rows:
+    def produce():
+        count = 0
+        for row in timed_iter(stats, "table_parsing", rows):
+            count += 1
+            yield row
+        if layout != "learned":
+            return
+        if count:
+            # Remember this header so the next invoice of the same layout takes the fast path
+            save_template(tenant_id, learn_template(header_line, header_columns(header_line), lines, header_index, tags))
+        elif stats is not None:
+            stats["layout_template"] = "miss"
+
+    return produce(), footer
+
+def parse_pages(pages, tenant_id="default_tenant", stats=None):
+    """Stage 4: turns per-page token data into (rows, footer), rows as a list."""
+    rows, footer = stream_pages(pages, tenant_id, stats)
+    return list(rows), footer
+
+def reviewed(rows, evaluator, stats=None):
+    """Feeds each row to the InvoiceEvaluator on its way to the Excel writer."""
+    for row in rows:
+        with timed(stats, "review"):
+            evaluator.add(row)
+        yield row
+
+def finish_pipeline(image_path, rows, footer, tenant_id="default_tenant", stats=None, kept=None, render_excel=False):
+    """
+    Stages 5-7: review the rows and package the result.
+    `rows` may be a list or the generator from stream_pages(); it is consumed
+    once, review happening row by row. Pass a list as `kept` to collect the
+    rows (e.g. for the parse cache).
+    Returns (status, company_name, result): `result` is the structured output the
+    worker stores in job_results; Excel/CSV/JSON are rendered from it on download
+    (output/results.py). `render_excel` also writes the temporary Excel (manual runs),
+    whose path is then result["excel_path"].
+    """
+    image_path = Path(image_path)
+    rows = iter(rows)
+    first = next(rows, None)
+    if first is None:
         print(f"❌ Failed: No rows found in {image_path.name}")
         # Return a failure tuple so the worker can update DB status to FAILED
         return "FAILED", "Unknown-Company", None
+    rows = itertools.chain([first], rows)
+    if kept is None:
+        kept = []
+    rows = collect(rows, kept)
 
-    # 5. Header & Footer extraction
+    # 5. Header extraction
     invoice_header = [] # Placeholder for your header extraction logic
-    footer = extract_footer(lines)
     
     # 🟢 ALIGNMENT FIX: Extract Company Name safely
     company_name = invoice_header[0] if invoice_header else "Unknown-Company"
 
     # 6. Audit & Review Logic
-    # evaluate_invoice returns (status, reasons) e.g., ("OK", []) or ("FLAGGED", ["Total Mismatch"])
-    invoice_status, review_reasons = evaluate_invoice(rows, footer)
-
-    # 7. Generate Temporary Output
-    # The worker will handle renaming and moving this to the final tenant destination
-    excel_name = f"{image_path.stem}_temp.xlsx"
-    temp_final_path = TEMP_PROCESSING_DIR / excel_name
-
-    write_excel(
-        invoice_header, 
-        rows, 
-        footer, 
-        str(temp_final_path), 
-        invoice_status=invoice_status, 
-        review_reasons=review_reasons,  
-        tenant_id=tenant_id
-    )
-    
-    print(f"✅ Generated Temp Excel: {temp_final_path} | Status: {invoice_status}")
+    # The evaluator sees every row as it goes by and returns (status, reasons)
+    # e.g., ("OK", []) or ("NEEDS_REVIEW", ["Math Mismatch: ..."])
+    evaluator = InvoiceEvaluator(footer)
+    rows = reviewed(rows, evaluator, stats)
+
+    excel_path = None
+    if render_excel:
+        # 7. Generate Temporary Output (openpyxl is only loaded when asked for)
+        from output.excel_writer import write_excel
+        excel_path = TEMP_PROCESSING_DIR / f"{image_path.stem}_temp.xlsx"
+
+        # Parsing and review run inside the writer's loop; excel_write only counts the writer's own time
+        upstream = stage_ms(stats, "table_parsing", "review")
+        started = time.perf_counter()
+        written = write_excel(invoice_header, rows, footer, str(excel_path), evaluator=evaluator, tenant_id=tenant_id)
+        elapsed_ms = (time.perf_counter() - started) * 1000 - (stage_ms(stats, "table_parsing", "review") - upstream)
+        record_timing(stats, "excel_write", elapsed_ms, rows=written, bytes=excel_path.stat().st_size)
+    else:
+        for _ in rows:
+            pass
+
+    invoice_status, review_reasons = evaluator.result()
+    result = {
+        "status": invoice_status,
+        "company_name": company_name,
+        "rows": [row.to_dict() for row in kept],
+        "footer": footer,
+        "review_reasons": review_reasons,
+    }
+    if excel_path:
+        result["excel_path"] = str(excel_path)
+        print(f"✅ Generated Temp Excel: {excel_path} | Status: {invoice_status}")
+    else:
+        print(f"✅ Parsed {len(kept)} rows from {image_path.name} | Status: {invoice_status}")
 
     # 🟢 RETURN FOR WORKER: Return exactly what jobs/worker.py expects to unpack
-    return invoice_status, company_name, str(temp_final_path)
+    return invoice_status, company_name, result
+
+def collect(rows, kept):
+    """Passes rows through, keeping a reference to each in `kept`."""
+    for row in rows:
+        kept.append(row)
+        yield row
+
+def run_pipeline(image_path, tenant_id="default_tenant", content_hash=None, stats=None, render_excel=False):
+    """
+    The Core Engine: Processes a single image and returns (status, company_name, result).
+    Designed to be called by jobs/worker.py; see finish_pipeline for `result`.
+    Pass a dict as `stats` to receive per-job tuning data: per-page scaling
+    decisions under "pages" and per-stage timings under "timings".
+    """
+    started = time.perf_counter()
+    image_path = Path(image_path)
+    if not image_path.exists():
+        raise FileNotFoundError(f"Input image not found: {image_path}")
+
+    print(f"--- ⚙️ Processing: {image_path.name} (Tenant: {tenant_id}) ---")
+
+    # 0. Cache lookup
+    cached = lookup_cached(image_path, tenant_id, content_hash)
+
+    if cached["parsed"]:
+        rows, footer = cached["parsed"]["rows"], cached["parsed"]["footer"]
+    else:
+        # 1-3. OCR Steps
+        pages = cached["pages"]
+        if pages is None:
+            page_stats = stats.setdefault("pages", []) if stats is not None else None
+            pages = run_ocr(image_path, page_stats)
+            cache_ocr(cached["content_hash"], pages)
+            for page in page_stats or []:
+                merge_timings(stats, page)
+
+        # 4. Table Parsing (streamed straight into review + Excel)
+        rows, footer = stream_pages(pages, tenant_id, stats)
+
+    kept = []
+    result = finish_pipeline(image_path, rows, footer, tenant_id, stats, kept=kept, render_excel=render_excel)
+    if kept and not cached["parsed"]:
+        cache_parse(cached["content_hash"], tenant_id, cached["memory_version"], kept, footer)
+    if stats is not None:
+        stats["total_ms"] = round((time.perf_counter() - started) * 1000, 3)
+    return result
 
 if __name__ == "__main__":
     # Manual debugging mode
     # Usage: python main.py uploads/my_invoice.jpg
     if len(sys.argv) > 1:
-        run_pipeline(sys.argv[1])
+        run_pipeline(sys.argv[1], render_excel=True)
     else:
         print("Usage: python main.py <path_to_image>")
\ No newline at end of file
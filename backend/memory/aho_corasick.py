@@ -0,0 +1,81 @@
+#memory/aho_corasick.py
+from collections import deque
+
+NO_MATCH = float("inf")
+
+
+class SubstringAutomaton:
+    """
+    Aho-Corasick automaton over a fixed list of patterns.
+    `first_match(text)` scans the text once and returns the index of the
+    earliest pattern *in list order* that occurs anywhere in it, i.e. the
+    same answer as `next(i for i, p in enumerate(patterns) if p in text)`.
+    `find_all(text)` returns the indices of every pattern found, also in one pass.
+    """
+
+    def __init__(self, patterns):
+        self.goto = [{}]           # node -> {char: node}
+        fail = [0]
+        # Lowest pattern index ending at this node or at any of its suffix nodes
+        self.best = [NO_MATCH]
+        self.outputs = [()]        # every pattern index ending here (incl. suffixes)
+
+        # 1. Trie of all patterns
+        for index, pattern in enumerate(patterns):
+            if not pattern:
+                continue
+            node = 0
+            for char in pattern:
+                nxt = self.goto[node].get(char)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto[node][char] = nxt
+                    self.goto.append({})
+                    fail.append(0)
+                    self.best.append(NO_MATCH)
+                    self.outputs.append(())
+                node = nxt
+            self.best[node] = min(self.best[node], index)
+            self.outputs[node] += (index,)
+
+        # 2. Failure links, breadth first, folding each suffix's best match in
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self.goto[node].items():
+                queue.append(child)
+                f = fail[node]
+                while f and char not in self.goto[f]:
+                    f = fail[f]
+                fail[child] = self.goto[f].get(char, 0)
+                self.best[child] = min(self.best[child], self.best[fail[child]])
+                self.outputs[child] += self.outputs[fail[child]]
+        self.fail = fail
+
+    def first_match(self, text):
+        """Index of the first pattern (in list order) found in `text`, or None."""
+        goto, fail, best = self.goto, self.fail, self.best
+        node = 0
+        found = NO_MATCH
+        for char in text:
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            if best[node] < found:
+                found = best[node]
+                if found == 0:
+                    break
+        return None if found == NO_MATCH else found
+
+    def find_all(self, text):
+        """Set of indices of all patterns that occur in `text`."""
+        goto, fail, outputs = self.goto, self.fail, self.outputs
+        node = 0
+        found = set()
+        for char in text:
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            if outputs[node]:
+                found.update(outputs[node])
+        return found
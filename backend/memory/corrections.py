@@ -1,16 +1,39 @@
 #memory/corrections.py
+import os
 import json
-import difflib
+import time
+import fcntl
 import shutil
+import threading
+from contextlib import contextmanager
 from datetime import datetime
 from pathlib import Path
 from tenants.manager import get_tenant_paths
+from memory.fuzzy_index import FuzzyIndex
+from memory.aho_corasick import SubstringAutomaton
 
 # --- PATHING ---
 DEFAULT_PATHS = get_tenant_paths("default_tenant")
 DEFAULT_MEMORY_FILE = DEFAULT_PATHS["memory"]
 
-def create_memory_backup(memory_path):
+# How long a compiled memory is trusted before its file is stat()'ed again.
+# Within this window parsing does no filesystem work at all.
+MEMORY_RECHECK_SECONDS = float(os.getenv("MEMORY_RECHECK_SECONDS", "5"))
+
+# Where learned patterns live: "file" (per-tenant correction_memory.json) or
+# "db" (correction_patterns table, shared by every API replica and worker node).
+# In db mode the JSON file still supplies "keywords" and "known_clients".
+MEMORY_BACKEND = os.getenv("MEMORY_BACKEND", "file")
+
+# Memory keys learned from each reviewed column
+CORRECTION_FIELDS = {
+    "Amount": "amount_fixes",
+    "Service": "service_normalization",
+    "Name": "name_fixes"
+}
+MAX_MEMORY_VERSIONS = 10
+
+def create_memory_backup(memory_path, version=None):
     """Creates a timestamped snapshot of the memory before it is updated."""
     path = Path(memory_path)
     if not path.exists():
@@ -21,14 +44,32 @@ def create_memory_backup(memory_path):
     version_dir.mkdir(exist_ok=True)
 
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    backup_path = version_dir / f"correction_memory_{timestamp}.json"
+    # The version keeps two commits within the same second from sharing a file
+    suffix = f"_v{version}" if version is not None else ""
+    backup_path = version_dir / f"correction_memory_{timestamp}{suffix}.json"
     
     shutil.copy2(path, backup_path)
     
-    # Keep only the last 10 versions to save disk space
+    # Keep only the last MAX_MEMORY_VERSIONS versions to save disk space
     all_versions = sorted(version_dir.glob("*.json"), key=lambda x: x.stat().st_mtime)
-    if len(all_versions) > 10:
-        all_versions[0].unlink()
+    for old in all_versions[:-MAX_MEMORY_VERSIONS]:
+        old.unlink()
+
+@contextmanager
+def memory_lock(memory_path):
+    """
+    Exclusive lock on a tenant's memory across threads and processes (API
+    replicas, mass_train), held for a whole load -> modify -> save cycle so
+    concurrent learners never drop each other's corrections.
+    """
+    path = Path(memory_path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path.with_suffix(".lock"), "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
 
 def load_memory(memory_path=None):
     """Loads memory from a specific path, or defaults to default_tenant."""
@@ -54,80 +95,258 @@ def save_memory(memory, memory_path=None):
     """Saves memory and creates an automatic version snapshot."""
     path = Path(memory_path) if memory_path else DEFAULT_MEMORY_FILE
     
-    # 1. Create backup of current state
-    create_memory_backup(path)
-
-    # 2. Update Metadata
+    # 1. Update Metadata
     if "meta" not in memory:
         memory["meta"] = {"version": 0}
+
+    # 2. Create backup of current state
+    create_memory_backup(path, memory["meta"]["version"])
+
     memory["meta"]["version"] += 1
     memory["meta"]["last_updated"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
-    # 3. Save
+    # 3. Save atomically: readers see the old file or the new one, never half of it
     path.parent.mkdir(parents=True, exist_ok=True)
-    with open(path, "w") as f:
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, "w") as f:
         json.dump(memory, f, indent=2)
+    os.replace(tmp_path, path)
+
+    # 4. Drop this process's compiled copy right away (other processes see the new mtime)
+    invalidate_compiled_memory(path)
 
-def apply_known_fixes(row, memory):
-    """Applies exact and fuzzy fixes using the memory dictionary."""
-    # Logic uses 'current' keys by default
-    raw_amount = row.get("Amount")
-    if raw_amount and str(raw_amount) in memory.get("amount_fixes", {}):
-        row["Amount"] = memory["amount_fixes"][str(raw_amount)]
-
-    name = row.get("Name", "")
-    if name:
-        name_memory = memory.get("name_fixes", {})
-        if name in name_memory:
-            row["Name"] = name_memory[name]
+class CorrectionBatch:
+    """
+    Collects the corrections found in one reviewed file and commits them
+    together: one load, one snapshot, one version bump and one atomic write,
+    under the tenant's memory lock.
+
+        with CorrectionBatch(tenant_id) as batch:
+            for original_row, corrected_row in pairs:
+                batch.add(original_row, corrected_row)
+
+    Nothing is written if the block raises or nothing was learned.
+    """
+
+    def __init__(self, tenant_id="default_tenant"):
+        self.tenant_id = tenant_id
+        self.fixes = {memory_key: {} for memory_key in CORRECTION_FIELDS.values()}
+        self.count = 0
+        self.version = None
+
+    def add(self, original_row, corrected_row):
+        """Queues every field where the human changed the OCR value. Returns how many."""
+        learned = 0
+        for field, memory_key in CORRECTION_FIELDS.items():
+            orig = original_row.get(field)
+            corr = corrected_row.get(field)
+
+            if orig and corr and str(orig).strip() != str(corr).strip():
+                self.fixes[memory_key][str(orig).strip()] = str(corr).strip()
+                learned += 1
+        self.count += learned
+        return learned
+
+    def commit(self):
+        """Writes the queued fixes as one new memory version. Returns it (None if nothing to learn)."""
+        if not self.count:
+            return None
+        if MEMORY_BACKEND == "db":
+            self.version = self._commit_to_db()
         else:
-            known_errors = list(name_memory.keys())
-            matches = difflib.get_close_matches(name, known_errors, n=1, cutoff=0.8)
-            if matches:
-                row["Name"] = name_memory[matches[0]]
+            self.version = self._commit_to_file()
+        self.fixes = {memory_key: {} for memory_key in CORRECTION_FIELDS.values()}
+        self.count = 0
+        print(f"💡 Learned & Versioned: v{self.version} for [{self.tenant_id}]")
+        return self.version
 
-    service = row.get("Service", "").strip()
-    if not service:
-        return row
+    def _commit_to_db(self):
+        # One upsert per learned pattern; the rest of the memory is untouched
+        from memory.store import commit_patterns
+        version = commit_patterns(self.tenant_id, self.fixes)
+        expire_compiled_memory(self.tenant_id)
+        return version
 
-    service_memory = memory.get("service_normalization", {})
-    if service in service_memory:
-        row["Service"] = service_memory[service]
-        return row
+    def _commit_to_file(self):
+        memory_path = get_tenant_paths(self.tenant_id)["memory"]
+        with memory_lock(memory_path):
+            memory = load_memory(memory_path)
+            for memory_key, fixes in self.fixes.items():
+                memory.setdefault(memory_key, {}).update(fixes)
+            save_memory(memory, memory_path)
+        return memory["meta"]["version"]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.commit()
+        return False
+
+class CompiledMemory:
+    """
+    Read-only lookup structures built once from a memory dict, so the per-row
+    fixes do no dict-to-list conversions or lower-casing of the whole memory.
+    """
 
-    matches = difflib.get_close_matches(service, list(service_memory.keys()), n=1, cutoff=0.85)
-    if matches:
-        row["Service"] = service_memory[matches[0]]
+    def __init__(self, memory):
+        self.raw = memory
+        self.version = memory.get("meta", {}).get("version", 0)
+        self.amount_fixes = dict(memory.get("amount_fixes", {}))
+        self.name_fixes = dict(memory.get("name_fixes", {}))
+        self.name_index = FuzzyIndex(self.name_fixes)
+        self.service_map = dict(memory.get("service_normalization", {}))
+        self.service_index = FuzzyIndex(self.service_map)
+        # Substring fallback, in memory order: first hit wins
+        substrings = [(noisy.lower(), clean) for noisy, clean in self.service_map.items() if len(noisy) > 5]
+        self.service_automaton = SubstringAutomaton([noisy for noisy, _ in substrings])
+        self.service_substring_fixes = [clean for _, clean in substrings]
+
+    def apply(self, row):
+        """Applies exact and fuzzy fixes to one InvoiceRow, in place."""
+        raw_amount = row.amount
+        if raw_amount and str(raw_amount) in self.amount_fixes:
+            row.amount = self.amount_fixes[str(raw_amount)]
+
+        name = row.name
+        if name:
+            if name in self.name_fixes:
+                row.name = self.name_fixes[name]
+            else:
+                match = self.name_index.best_match(name, cutoff=0.8)
+                if match is not None:
+                    row.name = self.name_fixes[match]
+
+        service = (row.service or "").strip()
+        if not service:
+            return row
+
+        if service in self.service_map:
+            row.service = self.service_map[service]
+            return row
+
+        match = self.service_index.best_match(service, cutoff=0.85)
+        if match is not None:
+            row.service = self.service_map[match]
+            return row
+
+        # One pass over the text finds every learned fragment it contains
+        hit = self.service_automaton.first_match(service.lower())
+        if hit is not None:
+            row.service = self.service_substring_fixes[hit]
         return row
 
-    for noisy, clean in service_memory.items():
-        if len(noisy) > 5 and noisy.lower() in service.lower():
-            row["Service"] = clean
-            break
-    return row
+# memory path -> {"memory": CompiledMemory, "mtime_ns": int, "checked_at": float}
+_COMPILED = {}
+_COMPILED_LOCK = threading.Lock()
+
+def _mtime_ns(path):
+    try:
+        return path.stat().st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+def get_compiled_memory(tenant_id="default_tenant"):
+    """
+    Returns the tenant's CompiledMemory from the process-local cache.
+    The file is stat()'ed at most once per MEMORY_RECHECK_SECONDS and only
+    re-read when its mtime or meta.version changed.
+    """
+    if MEMORY_BACKEND == "db":
+        return _get_db_compiled_memory(tenant_id)
+    path = get_tenant_paths(tenant_id)["memory"]
+    now = time.monotonic()
+    entry = _COMPILED.get(path)
+    if entry and now - entry["checked_at"] < MEMORY_RECHECK_SECONDS:
+        return entry["memory"]
+
+    with _COMPILED_LOCK:
+        entry = _COMPILED.get(path)
+        mtime_ns = _mtime_ns(path)
+        if entry and entry["mtime_ns"] == mtime_ns:
+            entry["checked_at"] = now
+            return entry["memory"]
+
+        memory = load_memory(path)
+        if entry and entry["memory"].raw == memory:
+            compiled = entry["memory"]      # touched but unchanged
+        else:
+            compiled = CompiledMemory(memory)
+        _COMPILED[path] = {"memory": compiled, "mtime_ns": mtime_ns, "checked_at": now}
+        return compiled
+
+def invalidate_compiled_memory(memory_path):
+    with _COMPILED_LOCK:
+        _COMPILED.pop(Path(memory_path), None)
+
+# tenant_id -> {"memory": CompiledMemory, "patterns": {kind: {noisy: clean}},
+#               "version": int, "base": dict, "mtime_ns": int, "checked_at": float}
+_DB_COMPILED = {}
+
+def _get_db_compiled_memory(tenant_id):
+    """
+    db mode: keeps the tenant's patterns in the process and, at most once per
+    MEMORY_RECHECK_SECONDS, fetches only the rows changed since the cached
+    version. The lookup structures are rebuilt only when something changed.
+    """
+    from memory.store import PATTERN_KINDS, fetch_patterns_since
+
+    now = time.monotonic()
+    entry = _DB_COMPILED.get(tenant_id)
+    if entry and now - entry["checked_at"] < MEMORY_RECHECK_SECONDS:
+        return entry["memory"]
+
+    with _COMPILED_LOCK:
+        entry = _DB_COMPILED.get(tenant_id)
+        if entry and now - entry["checked_at"] < MEMORY_RECHECK_SECONDS:
+            return entry["memory"]
+        if entry is None:
+            entry = {"memory": None, "patterns": {kind: {} for kind in PATTERN_KINDS},
+                     "version": 0, "base": None, "mtime_ns": None, "checked_at": now}
+
+        # 1. Keywords / known clients still come from the tenant's JSON file
+        path = get_tenant_paths(tenant_id)["memory"]
+        mtime_ns = _mtime_ns(path)
+        changed = entry["base"] is None or entry["mtime_ns"] != mtime_ns
+        if changed:
+            entry["base"] = load_memory(path)
+            entry["mtime_ns"] = mtime_ns
+
+        # 2. Patterns: apply the delta since the cached version
+        try:
+            delta = fetch_patterns_since(tenant_id, entry["version"])
+        except Exception as e:
+            if entry["memory"] is None:
+                raise
+            print(f"⚠️ Warning: could not refresh correction memory for [{tenant_id}]: {e}")
+            delta = []
+        for pattern in delta:
+            section = entry["patterns"][pattern["kind"]]
+            if pattern["clean_value"] is None:
+                section.pop(pattern["noisy_value"], None)
+            else:
+                section[pattern["noisy_value"]] = pattern["clean_value"]
+            entry["version"] = max(entry["version"], pattern["version"])
+
+        # 3. Recompile only when something changed
+        if changed or delta:
+            memory = dict(entry["base"])
+            memory.update(entry["patterns"])
+            memory["meta"] = dict(memory.get("meta", {}), version=entry["version"])
+            entry["memory"] = CompiledMemory(memory)
+        entry["checked_at"] = now
+        _DB_COMPILED[tenant_id] = entry
+        return entry["memory"]
+
+def expire_compiled_memory(tenant_id):
+    """db mode: makes the next lookup fetch the delta right away (this process's own commits)."""
+    with _COMPILED_LOCK:
+        entry = _DB_COMPILED.get(tenant_id)
+        if entry:
+            entry["checked_at"] = float("-inf")
 
 def record_human_correction(original_row, corrected_row, tenant_id="default_tenant"):
     """Learns differences between OCR and Human corrections for a specific tenant."""
-    paths = get_tenant_paths(tenant_id)
-    memory_path = paths["memory"]
-    
-    memory = load_memory(memory_path)
-    learned = False
-
-    fields_map = {
-        "Amount": "amount_fixes",
-        "Service": "service_normalization",
-        "Name": "name_fixes"
-    }
-
-    for field, memory_key in fields_map.items():
-        orig = original_row.get(field)
-        corr = corrected_row.get(field)
-        
-        if orig and corr and str(orig).strip() != str(corr).strip():
-            memory[memory_key][str(orig).strip()] = str(corr).strip()
-            learned = True
-
-    if learned:
-        save_memory(memory, memory_path)
-        print(f"💡 Learned & Versioned: v{memory['meta']['version']} for [{tenant_id}]")
\ No newline at end of file
+    with CorrectionBatch(tenant_id) as batch:
+        batch.add(original_row, corrected_row)
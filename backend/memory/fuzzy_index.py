@@ -0,0 +1,100 @@
+#memory/fuzzy_index.py
+import difflib
+from collections import defaultdict
+
+import numpy as np
+
+# Bigrams: with trigrams the lower bound below is never positive at the
+# 0.8/0.85 cutoffs we use, so every key would have to be verified.
+GRAM_SIZE = 2
+IMPOSSIBLE = 1 << 40        # bigram requirement for key lengths that cannot reach the cutoff
+SCAN_BELOW = 200            # smaller memories are cheaper to scan than to index
+
+
+def _grams(text):
+    counts = defaultdict(int)
+    for i in range(len(text) - GRAM_SIZE + 1):
+        counts[text[i:i + GRAM_SIZE]] += 1
+    return counts
+
+
+def _min_matches(total_len, cutoff):
+    """Smallest matched-character count M with difflib ratio 2M/total >= cutoff."""
+    m = max(int(cutoff * total_len / 2) - 1, 0)
+    while 2.0 * m / total_len < cutoff:
+        m += 1
+    return m
+
+
+class FuzzyIndex:
+    """
+    Drop-in for `difflib.get_close_matches(word, keys, n=1, cutoff)` over a
+    fixed key set, without scoring every key.
+
+    Candidates are narrowed with two bounds that can never reject a real match:
+      1. length: difflib's real_quick_ratio, 2*min(la, lb) / (la + lb) >= cutoff
+      2. shared bigrams: a ratio >= cutoff needs M matched chars in at most
+         (la + lb - 2M + 1) blocks, and every block of length b shares b - 1
+         bigrams, so the key must share at least 3M - la - lb - 1 bigrams.
+    Survivors are scored with SequenceMatcher exactly as get_close_matches does,
+    including its tie-break (highest score, then the largest key).
+    """
+
+    def __init__(self, keys):
+        self.keys = list(keys)
+        self.key_lengths = np.fromiter((len(k) for k in self.keys), dtype=np.int32, count=len(self.keys))
+        self.lengths = sorted(set(self.key_lengths.tolist()))
+        self.max_length = self.lengths[-1] if self.lengths else 0
+
+        postings = defaultdict(lambda: ([], []))
+        for key_id, key in enumerate(self.keys):
+            for gram, count in _grams(key).items():
+                ids, counts = postings[gram]
+                ids.append(key_id)
+                counts.append(count)
+        # bigram -> (key ids, occurrences in each key)
+        self.postings = {
+            gram: (np.array(ids, dtype=np.int32), np.array(counts, dtype=np.int32))
+            for gram, (ids, counts) in postings.items()
+        }
+
+    def __len__(self):
+        return len(self.keys)
+
+    def _required_bigrams(self, lb, cutoff):
+        """Per key length: bigrams a key must share with the query (IMPOSSIBLE = skip)."""
+        table = np.full(self.max_length + 1, IMPOSSIBLE, dtype=np.int64)
+        for la in self.lengths:
+            if la + lb == 0 or 2.0 * min(la, lb) / (la + lb) < cutoff:
+                continue
+            table[la] = 3 * _min_matches(la + lb, cutoff) - la - lb - 1
+        return table
+
+    def _candidates(self, word, cutoff):
+        if len(self.keys) <= SCAN_BELOW:
+            return range(len(self.keys))
+        need = self._required_bigrams(len(word), cutoff)[self.key_lengths]
+        shared = np.zeros(len(self.keys), dtype=np.int64)
+        for gram, count in _grams(word).items():
+            posting = self.postings.get(gram)
+            if posting is not None:
+                ids, counts = posting
+                shared[ids] += np.minimum(counts, count)
+        return np.flatnonzero(shared >= need)
+
+    def best_match(self, word, cutoff):
+        """Returns the key get_close_matches(word, keys, n=1, cutoff) would, or None."""
+        if not self.keys:
+            return None
+        matcher = difflib.SequenceMatcher()
+        matcher.set_seq2(word)
+        best = None
+        for key_id in self._candidates(word, cutoff):
+            key = self.keys[key_id]
+            matcher.set_seq1(key)
+            if (matcher.real_quick_ratio() >= cutoff and
+                    matcher.quick_ratio() >= cutoff):
+                score = matcher.ratio()
+                if score >= cutoff and (best is None or (score, key) > best):
+                    best = (score, key)
+        return best[1] if best else None
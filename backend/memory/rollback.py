@@ -1,6 +1,7 @@
 #memory/rollback.py
 import sys
 from tenants.manager import get_tenant_paths
+from memory.corrections import MEMORY_BACKEND
 import shutil
 
 def list_versions(tenant_id):
@@ -22,12 +23,48 @@ def list_versions(tenant_id):
         print(f"[{i}] {b.name}")
     return backups
 
+def list_db_versions(tenant_id):
+    """MEMORY_BACKEND=db: every committed version, with how many patterns it changed."""
+    from memory.store import list_versions as list_pattern_versions
+
+    versions = list_pattern_versions(tenant_id)
+    if not versions:
+        print(f"📍 No version history found for {tenant_id}")
+        return None
+
+    print(f"\n--- 🕒 Version History for {tenant_id} ---")
+    for v in versions:
+        print(f"[v{v['version']}] {v['changed_at']:%Y-%m-%d %H:%M:%S} ({v['changes']} patterns)")
+    return [v["version"] for v in versions]
+
+def restore_db_version(tenant_id):
+    from memory.store import rollback_to_version
+
+    versions = list_db_versions(tenant_id)
+    if not versions:
+        return
+
+    choice = input("\nEnter version to restore (or 'q' to quit): ").lstrip("v")
+    if choice.isdigit() and int(choice) in versions:
+        # Everything changed after the chosen version is reverted as a new version
+        new_version = rollback_to_version(tenant_id, int(choice))
+        if new_version is None:
+            print(f"ℹ️ v{choice} is already the current memory.")
+        else:
+            print(f"✅ SUCCESS: Rolled back to v{choice} (saved as v{new_version})")
+    else:
+        print("Operation cancelled.")
+
 if __name__ == "__main__":
     if len(sys.argv) < 2:
         print("Usage: python3 memory/rollback.py <tenant_id>")
         sys.exit(1)
 
     tid = sys.argv[1]
+    if MEMORY_BACKEND == "db":
+        restore_db_version(tid)
+        sys.exit(0)
+
     backups = list_versions(tid)
     
     if backups:
@@ -40,4 +77,4 @@ if __name__ == "__main__":
             shutil.copy2(target, current_path)
             print(f"✅ SUCCESS: Rolled back to {target.name}")
         else:
-            print("Operation cancelled.")
\ No newline at end of file
+            print("Operation cancelled.")
@@ -0,0 +1,121 @@
+#memory/store.py
+from datetime import datetime
+from psycopg2.extras import RealDictCursor, execute_values
+from database.connection import get_db
+
+# Memory sections kept as rows of correction_patterns (kind = memory key).
+# Versions come from one global sequence, so they only ever increase; a
+# per-tenant advisory lock makes each tenant's versions commit in order, which
+# lets readers ask for "everything after version N" without missing a row.
+PATTERN_KINDS = ("amount_fixes", "service_normalization", "name_fixes")
+
+def _write_version(cur, tenant_id, rows):
+    """
+    Upserts (kind, noisy_value, clean_value) rows as one new version, inside the
+    caller's transaction. clean_value None removes a pattern (kept as a tombstone
+    so delta readers drop it too). Returns the version.
+    """
+    # 1. Serialize writers of this tenant until commit
+    cur.execute("SELECT pg_advisory_xact_lock(hashtext(%s))", (tenant_id,))
+    cur.execute("SELECT nextval('correction_pattern_version_seq') AS version")
+    version = cur.fetchone()["version"]
+
+    values = [(tenant_id, kind, noisy, clean, version) for kind, noisy, clean in rows]
+
+    # 2. Current state: one row per pattern
+    execute_values(cur, """
+        INSERT INTO correction_patterns (tenant_id, kind, noisy_value, clean_value, version)
+        VALUES %s
+        ON CONFLICT (tenant_id, kind, noisy_value) DO UPDATE
+        SET clean_value = EXCLUDED.clean_value,
+            version = EXCLUDED.version,
+            updated_at = CURRENT_TIMESTAMP
+    """, values)
+
+    # 3. History: what every version changed, for rollback
+    execute_values(cur, """
+        INSERT INTO correction_pattern_history (tenant_id, kind, noisy_value, clean_value, version)
+        VALUES %s
+    """, values)
+    return version
+
+def commit_patterns(tenant_id, fixes):
+    """
+    Saves {kind: {noisy_value: clean_value}} as one new version.
+    Only the given patterns are written. Returns the version (None if empty).
+    """
+    rows = [(kind, noisy, clean) for kind, pairs in fixes.items() for noisy, clean in pairs.items()]
+    if not rows:
+        return None
+    with get_db() as conn:
+        with conn.cursor(cursor_factory=RealDictCursor) as cur:
+            version = _write_version(cur, tenant_id, rows)
+        conn.commit()
+    return version
+
+def fetch_patterns_since(tenant_id, version=0):
+    """Patterns changed after `version`, oldest first. Removed ones have clean_value None."""
+    with get_db() as conn:
+        with conn.cursor(cursor_factory=RealDictCursor) as cur:
+            cur.execute("""
+                SELECT kind, noisy_value, clean_value, version
+                FROM correction_patterns
+                WHERE tenant_id = %s AND version > %s
+                ORDER BY version
+            """, (tenant_id, version))
+            return cur.fetchall()
+
+def list_versions(tenant_id):
+    """Every version of the tenant's memory: [{version, changed_at, changes}], oldest first."""
+    with get_db() as conn:
+        with conn.cursor(cursor_factory=RealDictCursor) as cur:
+            cur.execute("""
+                SELECT version, MIN(changed_at) AS changed_at, COUNT(*) AS changes
+                FROM correction_pattern_history
+                WHERE tenant_id = %s
+                GROUP BY version
+                ORDER BY version
+            """, (tenant_id,))
+            return cur.fetchall()
+
+def rollback_to_version(tenant_id, version):
+    """
+    Restores the memory as it was at `version`. Only the patterns changed
+    after it are rewritten (to their value at that version, or removed), as
+    one new version, so readers pick the rollback up as a normal delta.
+    Returns the new version (None if nothing changed since).
+    """
+    with get_db() as conn:
+        with conn.cursor(cursor_factory=RealDictCursor) as cur:
+            # Under the tenant lock, so no commit slips in between the read and the write
+            cur.execute("SELECT pg_advisory_xact_lock(hashtext(%s))", (tenant_id,))
+            cur.execute("""
+                SELECT p.kind, p.noisy_value, (
+                    SELECT h.clean_value FROM correction_pattern_history h
+                    WHERE h.tenant_id = p.tenant_id AND h.kind = p.kind
+                      AND h.noisy_value = p.noisy_value AND h.version <= %s
+                    ORDER BY h.version DESC LIMIT 1
+                ) AS clean_value
+                FROM correction_patterns p
+                WHERE p.tenant_id = %s AND p.version > %s
+            """, (version, tenant_id, version))
+            rows = [(r["kind"], r["noisy_value"], r["clean_value"]) for r in cur.fetchall()]
+            new_version = _write_version(cur, tenant_id, rows) if rows else None
+        conn.commit()
+    return new_version
+
+def import_memory(tenant_id, memory):
+    """Loads the pattern sections of a correction_memory.json dict as one new version."""
+    fixes = {kind: dict(memory.get(kind, {})) for kind in PATTERN_KINDS}
+    return commit_patterns(tenant_id, fixes)
+
+def export_memory(tenant_id):
+    """The tenant's patterns in the correction_memory.json layout (pattern sections and meta only)."""
+    memory = {kind: {} for kind in PATTERN_KINDS}
+    version = 0
+    for pattern in fetch_patterns_since(tenant_id, 0):
+        version = max(version, pattern["version"])
+        if pattern["clean_value"] is not None:
+            memory[pattern["kind"]][pattern["noisy_value"]] = pattern["clean_value"]
+    memory["meta"] = {"version": version, "last_updated": datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
+    return memory
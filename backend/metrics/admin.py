@@ -1,47 +1,104 @@
 #metrics/admin.py
-from database.connection import get_db
-from psycopg2.extras import RealDictCursor
+from database.connection import get_pool_stats
+from database.async_connection import get_async_db, get_async_pool_stats, record_to_dict
+from metrics.timing import LATENCY_BUCKETS_MS
 
-def get_system_admin_metrics():
+async def get_system_admin_metrics():
     """Aggregates all system-wide health and performance data."""
-    with get_db() as conn:
-        with conn.cursor(cursor_factory=RealDictCursor) as cur:
-            # 1. Total jobs today & Queue Backlog & Stuck Workers
-            cur.execute("""
-                SELECT 
-                    COUNT(*) FILTER (WHERE created_at >= CURRENT_DATE) as total_today,
-                    COUNT(*) FILTER (WHERE status IN ('PENDING', 'RETRY')) as backlog,
-                    COUNT(*) FILTER (WHERE status = 'PROCESSING' 
-                                     AND started_at < CURRENT_TIMESTAMP - INTERVAL '10 minutes') as stuck_jobs
-                FROM jobs
-            """)
-            counts = cur.fetchone()
-
-            # 2. Jobs by status
-            cur.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status")
-            status_dist = cur.fetchall()
-
-            # 3. Avg processing time per tenant
-            cur.execute("""
-                SELECT tenant_id, AVG(finished_at - started_at) AS avg_processing_time
-                FROM jobs 
-                WHERE status IN ('COMPLETED', 'REVIEW_REQUIRED')
-                GROUP BY tenant_id
-            """)
-            processing_times = cur.fetchall()
-
-            # 4. Failure rate per tenant
-            cur.execute("""
-                SELECT tenant_id,
-                       COUNT(*) FILTER (WHERE status = 'FAILED')::float / 
-                       NULLIF(COUNT(*), 0) AS failure_rate
-                FROM jobs GROUP BY tenant_id
-            """)
-            failure_rates = cur.fetchall()
-
-            return {
-                "summary": counts,
-                "status_distribution": status_dist,
-                "tenant_performance": processing_times,
-                "tenant_failure_rates": failure_rates
-            }
\ No newline at end of file
+    async with get_async_db() as conn:
+        # 1. Total jobs today & Queue Backlog & Stuck Workers
+        counts = await conn.fetchrow("""
+            SELECT 
+                COUNT(*) FILTER (WHERE created_at >= CURRENT_DATE) as total_today,
+                COUNT(*) FILTER (WHERE status IN ('PENDING', 'RETRY')) as backlog,
+                COUNT(*) FILTER (WHERE status = 'PROCESSING' 
+                                 AND started_at < CURRENT_TIMESTAMP - INTERVAL '10 minutes') as stuck_jobs
+            FROM jobs
+        """)
+
+        # 2. Jobs by status
+        status_dist = await conn.fetch("SELECT status, COUNT(*) FROM jobs GROUP BY status")
+
+        # 3. Avg processing time per tenant
+        processing_times = await conn.fetch("""
+            SELECT tenant_id, AVG(finished_at - started_at) AS avg_processing_time
+            FROM jobs 
+            WHERE status IN ('COMPLETED', 'REVIEW_REQUIRED')
+            GROUP BY tenant_id
+        """)
+
+        # 4. Failure rate per tenant
+        failure_rates = await conn.fetch("""
+            SELECT tenant_id,
+                   COUNT(*) FILTER (WHERE status = 'FAILED')::float / 
+                   NULLIF(COUNT(*), 0) AS failure_rate
+            FROM jobs GROUP BY tenant_id
+        """)
+
+    return {
+        "summary": record_to_dict(counts),
+        "status_distribution": [dict(r) for r in status_dist],
+        "tenant_performance": [dict(r) for r in processing_times],
+        "tenant_failure_rates": [dict(r) for r in failure_rates],
+        "stage_latency": await get_stage_latency_histograms(),
+        "layout_templates": await get_template_hit_rate(),
+        "db_pool": {"sync": get_pool_stats(), "async": get_async_pool_stats()}
+    }
+
+async def get_stage_latency_histograms(tenant_id=None, days=7):
+    """
+    Per-stage latency of recent jobs, from jobs.pipeline_stats->'timings':
+    p50/p95 plus a histogram over LATENCY_BUCKETS_MS (bucket i counts jobs
+    faster than LATENCY_BUCKETS_MS[i]; the last bucket is everything slower).
+    """
+    async with get_async_db() as conn:
+        rows = await conn.fetch("""
+            SELECT t.stage,
+                   COUNT(*) AS jobs,
+                   percentile_cont(0.5) WITHIN GROUP (ORDER BY (t.entry->>'ms')::float) AS p50_ms,
+                   percentile_cont(0.95) WITHIN GROUP (ORDER BY (t.entry->>'ms')::float) AS p95_ms,
+                   array_agg(width_bucket((t.entry->>'ms')::float, $1::float[])) AS buckets
+            FROM jobs j, jsonb_each(j.pipeline_stats->'timings') AS t(stage, entry)
+            WHERE j.pipeline_stats ? 'timings'
+              AND j.finished_at >= CURRENT_TIMESTAMP - make_interval(days => $2)
+              AND ($3::text IS NULL OR j.tenant_id = $3)
+            GROUP BY t.stage
+        """, [float(b) for b in LATENCY_BUCKETS_MS], days, tenant_id)
+
+    histograms = {}
+    for row in rows:
+        # width_bucket returns 0..len(bounds); fold into one count per bucket
+        counts = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        for bucket in row["buckets"]:
+            counts[bucket] += 1
+        histograms[row["stage"]] = {
+            "jobs": row["jobs"],
+            "p50_ms": row["p50_ms"],
+            "p95_ms": row["p95_ms"],
+            "buckets_ms": LATENCY_BUCKETS_MS,
+            "counts": counts
+        }
+    return histograms
+
+async def get_template_hit_rate(tenant_id=None, days=7):
+    """
+    How often parsing took the learned-layout fast path (parser/templates.py),
+    from jobs.pipeline_stats->>'layout_template': hit / learned / miss / grid.
+    """
+    async with get_async_db() as conn:
+        row = await conn.fetchrow("""
+            SELECT COUNT(*) FILTER (WHERE pipeline_stats->>'layout_template' = 'hit') AS hits,
+                   COUNT(*) FILTER (WHERE pipeline_stats->>'layout_template' = 'learned') AS learned,
+                   COUNT(*) FILTER (WHERE pipeline_stats->>'layout_template' = 'miss') AS misses,
+                   COUNT(*) FILTER (WHERE pipeline_stats->>'layout_template' = 'grid') AS grid
+            FROM jobs
+            WHERE pipeline_stats ? 'layout_template'
+              AND finished_at >= CURRENT_TIMESTAMP - make_interval(days => $1)
+              AND ($2::text IS NULL OR tenant_id = $2)
+        """, days, tenant_id)
+
+    stats = record_to_dict(row)
+    # Grid pages never go through header detection, so they don't count either way
+    eligible = stats["hits"] + stats["learned"] + stats["misses"]
+    stats["hit_rate"] = round(stats["hits"] / eligible, 3) if eligible else None
+    return stats
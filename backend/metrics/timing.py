@@ -0,0 +1,82 @@
+#metrics/timing.py
+import time
+import threading
+from contextlib import contextmanager
+
+# Pipeline stages in execution order (keys of stats["timings"])
+PIPELINE_STAGES = [
+    "decode", "deskew", "resize", "threshold", "ocr",
+    "line_grouping", "line_classification", "header_detection", "table_parsing", "memory_fixes",
+    "review", "excel_write"
+]
+
+# Upper bounds (ms) of the latency histogram buckets
+LATENCY_BUCKETS_MS = [5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000]
+
+# PDF pages are OCR'd on threads that share one job's stats
+_LOCK = threading.Lock()
+
+def record_timing(stats, stage, elapsed_ms, **counts):
+    """
+    Adds one measurement to stats["timings"][stage]. Repeated calls (one per page,
+    one per row...) accumulate. `counts` are sizes like pixels=, bytes=, rows=.
+    A None `stats` makes this a no-op so callers never need to check.
+    """
+    if stats is None:
+        return
+    with _LOCK:
+        entry = stats.setdefault("timings", {}).setdefault(stage, {"ms": 0.0, "calls": 0})
+        entry["ms"] = round(entry["ms"] + elapsed_ms, 3)
+        entry["calls"] += 1
+        for key, value in counts.items():
+            if value is not None:
+                entry[key] = entry.get(key, 0) + int(value)
+
+@contextmanager
+def timed(stats, stage, **counts):
+    """
+    Times the enclosed block. Yields a dict so sizes only known afterwards
+    can be added, e.g. `with timed(stats, "excel_write") as rec: ...; rec["bytes"] = n`.
+    """
+    extra = {}
+    start = time.perf_counter()
+    try:
+        yield extra
+    finally:
+        record_timing(stats, stage, (time.perf_counter() - start) * 1000, **counts, **extra)
+
+def merge_timings(target, source):
+    """Folds the timings of `source` (e.g. one page) into `target` (the job)."""
+    for stage, entry in (source or {}).get("timings", {}).items():
+        counts = {k: v for k, v in entry.items() if k not in ("ms", "calls")}
+        record_timing(target, stage, entry["ms"], **counts)
+        with _LOCK:
+            target["timings"][stage]["calls"] += entry["calls"] - 1
+
+def timed_iter(stats, stage, iterable, **counts):
+    """
+    Times a streaming stage: only the time spent producing each item counts,
+    not what the consumer does with it. Records rows= (items yielded) once the
+    stream is exhausted or closed.
+    """
+    elapsed = 0.0
+    produced = 0
+    items = iter(iterable)
+    try:
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(items)
+            except StopIteration:
+                elapsed += time.perf_counter() - start
+                break
+            elapsed += time.perf_counter() - start
+            produced += 1
+            yield item
+    finally:
+        record_timing(stats, stage, elapsed * 1000, rows=produced, **counts)
+
+def stage_ms(stats, *stages):
+    """Total ms recorded so far for `stages` (0 for stages not reached yet)."""
+    timings = (stats or {}).get("timings", {})
+    return sum(timings.get(stage, {}).get("ms", 0.0) for stage in stages)
@@ -0,0 +1,24 @@
+"""add_job_content_hash
+
+Revision ID: add_job_content_hash
+Revises: add_unique_to_payments
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = 'add_job_content_hash'
+down_revision = 'add_unique_to_payments' # Links to your previous migration
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # SHA-256 of the uploaded bytes, computed at ingest.
+    # Workers use it as the key into the OCR/parse result cache.
+    op.execute("ALTER TABLE jobs ADD COLUMN content_hash CHAR(64);")
+    op.execute("CREATE INDEX idx_jobs_content_hash ON jobs(content_hash);")
+
+def downgrade():
+    op.execute("DROP INDEX IF EXISTS idx_jobs_content_hash;")
+    op.execute("ALTER TABLE jobs DROP COLUMN IF EXISTS content_hash;")
@@ -0,0 +1,53 @@
+"""add_correction_patterns
+
+Revision ID: add_correction_patterns
+Revises: add_job_results_export_index
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = 'add_correction_patterns'
+down_revision = 'add_job_results_export_index' # Links to your previous migration
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # One version per learning commit, shared by all tenants; always increasing
+    op.execute("CREATE SEQUENCE correction_pattern_version_seq;")
+
+    # Current correction memory: one row per learned pattern.
+    # clean_value NULL marks a removed pattern, so delta readers see removals too.
+    op.execute("""
+    CREATE TABLE correction_patterns (
+        tenant_id TEXT NOT NULL REFERENCES tenants(id) ON DELETE CASCADE,
+        kind TEXT NOT NULL,
+        noisy_value TEXT NOT NULL,
+        clean_value TEXT,
+        version BIGINT NOT NULL,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (tenant_id, kind, noisy_value)
+    );
+    """)
+    op.execute("CREATE INDEX idx_correction_patterns_version ON correction_patterns (tenant_id, version);")
+
+    # Every change ever made, for rollback to any earlier version
+    op.execute("""
+    CREATE TABLE correction_pattern_history (
+        id BIGSERIAL PRIMARY KEY,
+        tenant_id TEXT NOT NULL REFERENCES tenants(id) ON DELETE CASCADE,
+        kind TEXT NOT NULL,
+        noisy_value TEXT NOT NULL,
+        clean_value TEXT,
+        version BIGINT NOT NULL,
+        changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    """)
+    op.execute("CREATE INDEX idx_correction_history_version ON correction_pattern_history (tenant_id, version);")
+    op.execute("CREATE INDEX idx_correction_history_pattern ON correction_pattern_history (tenant_id, kind, noisy_value, version);")
+
+def downgrade():
+    op.execute("DROP TABLE IF EXISTS correction_pattern_history;")
+    op.execute("DROP TABLE IF EXISTS correction_patterns;")
+    op.execute("DROP SEQUENCE IF EXISTS correction_pattern_version_seq;")
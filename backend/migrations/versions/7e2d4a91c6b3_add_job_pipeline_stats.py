@@ -0,0 +1,21 @@
+"""add_job_pipeline_stats
+
+Revision ID: add_job_pipeline_stats
+Revises: add_job_content_hash
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = 'add_job_pipeline_stats'
+down_revision = 'add_job_content_hash' # Links to your previous migration
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # Per-job pipeline data written by the worker (e.g. resolution scaling decisions)
+    op.execute("ALTER TABLE jobs ADD COLUMN pipeline_stats JSONB;")
+
+def downgrade():
+    op.execute("ALTER TABLE jobs DROP COLUMN IF EXISTS pipeline_stats;")
@@ -0,0 +1,34 @@
+"""add_job_results
+
+Revision ID: add_job_results
+Revises: add_job_pipeline_stats
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = 'add_job_results'
+down_revision = 'add_job_pipeline_stats' # Links to your previous migration
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # Structured output of a job; Excel/CSV/JSON are rendered from it on download
+    op.execute("""
+    CREATE TABLE job_results (
+        job_id UUID PRIMARY KEY REFERENCES jobs(id) ON DELETE CASCADE,
+        tenant_id TEXT NOT NULL REFERENCES tenants(id) ON DELETE CASCADE,
+        status TEXT NOT NULL,
+        company_name TEXT,
+        line_items JSONB NOT NULL,
+        footer JSONB,
+        review_reasons JSONB,
+        row_count INTEGER NOT NULL DEFAULT 0,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    """)
+    op.execute("CREATE INDEX idx_job_results_tenant ON job_results (tenant_id, updated_at);")
+
+def downgrade():
+    op.execute("DROP TABLE IF EXISTS job_results;")
@@ -0,0 +1,23 @@
+"""add_job_results_export_index
+
+Revision ID: add_job_results_export_index
+Revises: add_job_results
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = 'add_job_results_export_index'
+down_revision = 'add_job_results' # Links to your previous migration
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # Exports page through a tenant's results by (updated_at, job_id); the key must be fully indexed
+    op.execute("DROP INDEX IF EXISTS idx_job_results_tenant;")
+    op.execute("CREATE INDEX idx_job_results_tenant_keyset ON job_results (tenant_id, updated_at, job_id);")
+
+def downgrade():
+    op.execute("DROP INDEX IF EXISTS idx_job_results_tenant_keyset;")
+    op.execute("CREATE INDEX idx_job_results_tenant ON job_results (tenant_id, updated_at);")
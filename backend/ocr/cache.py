@@ -0,0 +1,60 @@
+#ocr/cache.py
+import os
+import hashlib
+
+from storage.cache import ContentCache
+from tenants.manager import BASE_DIR
+from ocr.engine import TESSEROCR_AVAILABLE, OCR_LANG, DEFAULT_PSM
+from ocr.pdf import PDF_RENDER_DPI
+from ocr.regions import OCR_TABLE_REGIONS
+from ocr.cells import OCR_CELL_MODE
+from parser.models import InvoiceRow
+
+# Bump whenever preprocessing or OCR settings change what Tesseract returns,
+# so stale token data is never served for a new pipeline.
+OCR_PIPELINE_VERSION = 5
+
+# Bump whenever line grouping or parsing changes what rows come out of the same tokens.
+PARSE_VERSION = 4
+
+CACHE_ROOT = BASE_DIR / "runtime" / "cache"
+OCR_CACHE_MAX_MB = int(os.getenv("OCR_CACHE_MAX_MB", "512"))
+PARSED_CACHE_MAX_MB = int(os.getenv("PARSED_CACHE_MAX_MB", "128"))
+
+# Raw token data is shared by all tenants; parsed rows depend on tenant memory
+OCR_CACHE = ContentCache(CACHE_ROOT / "ocr", max_bytes=OCR_CACHE_MAX_MB * 1024 * 1024)
+PARSED_CACHE = ContentCache(CACHE_ROOT / "parsed", max_bytes=PARSED_CACHE_MAX_MB * 1024 * 1024)
+
+def engine_signature():
+    """Everything that influences the OCR tokens for a given file."""
+    engine = "tesserocr" if TESSEROCR_AVAILABLE else "pytesseract"
+    return (
+        f"v{OCR_PIPELINE_VERSION}|{engine}|{OCR_LANG}|psm{DEFAULT_PSM}|dpi{PDF_RENDER_DPI}"
+        f"|regions{int(OCR_TABLE_REGIONS)}|cells{int(OCR_CELL_MODE)}"
+    )
+
+def _key(*parts):
+    return hashlib.sha256("|".join(str(p) for p in parts).encode("utf-8")).hexdigest()
+
+def get_cached_ocr(content_hash):
+    """Returns the per-page token data for this file, or None."""
+    return OCR_CACHE.get(_key(content_hash, engine_signature()))
+
+def cache_ocr(content_hash, pages):
+    OCR_CACHE.put(_key(content_hash, engine_signature()), pages)
+
+def get_cached_parse(content_hash, tenant_id, memory_version):
+    """Returns {"rows": [InvoiceRow...], "footer": {...}} parsed with this memory version, or None."""
+    parsed = PARSED_CACHE.get(_key(content_hash, engine_signature(), PARSE_VERSION, tenant_id, memory_version))
+    if parsed:
+        parsed["rows"] = [InvoiceRow.from_dict(row) for row in parsed["rows"]]
+    return parsed
+
+def cache_parse(content_hash, tenant_id, memory_version, rows, footer):
+    PARSED_CACHE.put(
+        _key(content_hash, engine_signature(), PARSE_VERSION, tenant_id, memory_version),
+        {"rows": [row.to_dict() for row in rows], "footer": footer}
+    )
+
+def cache_stats():
+    return {"ocr": OCR_CACHE.stats(), "parsed": PARSED_CACHE.stats()}
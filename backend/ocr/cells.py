@@ -0,0 +1,107 @@
+#ocr/cells.py
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+from config import COLUMN_SYNONYMS, AMOUNT_CHAR_WHITELIST
+from ocr.engine import OCR_ENGINE_POOL_SIZE
+from ocr.tesseract_ocr import extract_ocr_data
+
+# --- CONFIGURATION ---
+OCR_CELL_MODE = os.getenv("OCR_CELL_MODE", "1") == "1"
+SINGLE_LINE_PSM = 7         # Treat the crop as a single text line
+CELL_BORDER = 10            # White margin added around each crop (Tesseract likes a border)
+MIN_CELL_INK = 15           # Fewer dark pixels than this = empty cell, no OCR call
+
+
+def _line_positions(mask, axis, min_span):
+    """Centers of the ruling lines in a mask (axis=1 -> horizontal lines' y)."""
+    coverage = np.count_nonzero(mask, axis=axis)
+    hits = np.flatnonzero(coverage >= min_span)
+    if hits.size == 0:
+        return []
+
+    # Consecutive pixel rows/cols belong to the same (thick) line
+    groups = np.split(hits, np.flatnonzero(np.diff(hits) > 1) + 1)
+    return [(int(g[0]), int(g[-1])) for g in groups]
+
+
+def find_grid(binary, horizontal, vertical):
+    """
+    Returns (row_bands, col_bands): the (start, end) pixel ranges between
+    consecutive ruling lines, or None when the page has no usable grid.
+    """
+    h, w = binary.shape[:2]
+    h_lines = _line_positions(horizontal, axis=1, min_span=w * 0.3)
+    v_lines = _line_positions(vertical, axis=0, min_span=h * 0.05)
+    if len(h_lines) < 2 or len(v_lines) < 3:
+        return None
+
+    row_bands = [(a[1] + 1, b[0]) for a, b in zip(h_lines, h_lines[1:]) if b[0] - a[1] > 8]
+    col_bands = [(a[1] + 1, b[0]) for a, b in zip(v_lines, v_lines[1:]) if b[0] - a[1] > 8]
+    if len(row_bands) < 2 or len(col_bands) < 2:
+        return None
+    return row_bands, col_bands
+
+
+def _cell_image(binary, line_mask, row, col):
+    (y0, y1), (x0, x1) = row, col
+    cell = binary[y0:y1, x0:x1].copy()
+    # Blank out any ruling-line pixels that leaked into the crop
+    cell[line_mask[y0:y1, x0:x1] > 0] = 255
+    return cell
+
+
+def _ocr_cell(cell, whitelist=None):
+    if np.count_nonzero(cell < 128) < MIN_CELL_INK:
+        return ""
+    padded = cv2.copyMakeBorder(cell, CELL_BORDER, CELL_BORDER, CELL_BORDER, CELL_BORDER,
+                                cv2.BORDER_CONSTANT, value=255)
+    data = extract_ocr_data(padded, psm=SINGLE_LINE_PSM, whitelist=whitelist)
+    return " ".join(t for t in data["text"] if t.strip())
+
+
+def column_key(header_text):
+    """Maps a header cell to its canonical column key (or None)."""
+    for word in header_text.lower().split():
+        for key, aliases in COLUMN_SYNONYMS.items():
+            if word in aliases:
+                return key
+    return None
+
+
+def extract_grid_cells(binary, horizontal, vertical):
+    """
+    OCRs a ruled table cell by cell. The header row is read first to learn which
+    column holds amounts; that column is then read with a digits-only whitelist.
+    Returns {"header": [...], "columns": [...], "cells": [[...], ...]} or None.
+    """
+    grid = find_grid(binary, horizontal, vertical)
+    if grid is None:
+        return None
+    row_bands, col_bands = grid
+    line_mask = cv2.bitwise_or(horizontal, vertical)
+
+    with ThreadPoolExecutor(max_workers=OCR_ENGINE_POOL_SIZE) as pool:
+        # 1. Header row: normal character set
+        header = list(pool.map(
+            lambda col: _ocr_cell(_cell_image(binary, line_mask, row_bands[0], col)),
+            col_bands
+        ))
+        columns = [column_key(text) for text in header]
+
+        # 2. Body cells, all in parallel, with per-column settings
+        jobs = []
+        for row in row_bands[1:]:
+            for col, key in zip(col_bands, columns):
+                whitelist = AMOUNT_CHAR_WHITELIST if key == "amount" else None
+                cell = _cell_image(binary, line_mask, row, col)
+                jobs.append(pool.submit(_ocr_cell, cell, whitelist))
+
+        texts = [job.result() for job in jobs]
+
+    width = len(col_bands)
+    cells = [texts[i:i + width] for i in range(0, len(texts), width)]
+    return {"header": header, "columns": columns, "cells": cells}
@@ -0,0 +1,192 @@
+#ocr/engine.py
+import os
+import time
+import queue
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+
+# tesserocr binds the Tesseract C API directly (models stay loaded in memory).
+# It needs libtesseract headers to build, so pytesseract stays as the fallback.
+try:
+    from tesserocr import PyTessBaseAPI, RIL, OEM, iterate_level
+    TESSEROCR_AVAILABLE = True
+except ImportError:
+    TESSEROCR_AVAILABLE = False
+
+import pytesseract
+from pytesseract import Output
+
+# Point to the NATIVE apt installation, not the Snap one
+pytesseract.pytesseract.tesseract_cmd = r'/usr/bin/tesseract'
+
+# --- CONFIGURATION ---
+OCR_LANG = os.getenv("OCR_LANG", "eng")
+OCR_ENGINE_POOL_SIZE = int(os.getenv("OCR_ENGINE_POOL_SIZE", "2"))
+OCR_ENGINE_WAIT_SECONDS = float(os.getenv("OCR_ENGINE_WAIT_SECONDS", "300"))   # max wait for a busy pool
+DEFAULT_PSM = 4  # Single column of text (what the whole-page call always used)
+
+# Keys produced by pytesseract.image_to_data, which ocr/layout.py consumes
+OCR_DATA_KEYS = [
+    "level", "page_num", "block_num", "par_num", "line_num", "word_num",
+    "left", "top", "width", "height", "conf", "text"
+]
+
+
+def _empty_ocr_data():
+    return {key: [] for key in OCR_DATA_KEYS}
+
+
+class TesserocrEngine:
+    """A long-lived Tesseract handle. The LSTM model is loaded once, in __init__."""
+
+    def __init__(self, lang=OCR_LANG):
+        self.api = PyTessBaseAPI(lang=lang, oem=OEM.DEFAULT)
+
+    def recognize(self, image, psm=DEFAULT_PSM, whitelist=None):
+        """Runs OCR on a numpy buffer and returns the image_to_data dict shape."""
+        image = np.ascontiguousarray(image, dtype=np.uint8)
+        height, width = image.shape[:2]
+        channels = 1 if image.ndim == 2 else image.shape[2]
+
+        api = self.api
+        api.SetPageSegMode(psm)
+        api.SetVariable("tessedit_char_whitelist", whitelist or "")
+        api.SetImageBytes(image.tobytes(), width, height, channels, image.strides[0])
+        api.Recognize()
+
+        data = _empty_ocr_data()
+        iterator = api.GetIterator()
+        if iterator is None:
+            api.Clear()
+            return data
+
+        block_num = par_num = line_num = word_num = 0
+        for word in iterate_level(iterator, RIL.WORD):
+            text = word.GetUTF8Text(RIL.WORD)
+            if text is None:
+                continue
+
+            # Rebuild Tesseract's hierarchy counters exactly like the TSV output
+            if word.IsAtBeginningOf(RIL.BLOCK):
+                block_num += 1
+                par_num = line_num = 0
+            if word.IsAtBeginningOf(RIL.PARA):
+                par_num += 1
+                line_num = 0
+            if word.IsAtBeginningOf(RIL.TEXTLINE):
+                line_num += 1
+                word_num = 0
+            word_num += 1
+
+            x1, y1, x2, y2 = word.BoundingBox(RIL.WORD)
+            data["level"].append(5)
+            data["page_num"].append(1)
+            data["block_num"].append(block_num)
+            data["par_num"].append(par_num)
+            data["line_num"].append(line_num)
+            data["word_num"].append(word_num)
+            data["left"].append(x1)
+            data["top"].append(y1)
+            data["width"].append(x2 - x1)
+            data["height"].append(y2 - y1)
+            data["conf"].append(word.Confidence(RIL.WORD))
+            data["text"].append(text)
+
+        api.Clear()
+        return data
+
+    def close(self):
+        self.api.End()
+
+
+class PytesseractEngine:
+    """Fallback engine: one tesseract subprocess per call (the original behaviour)."""
+
+    def recognize(self, image, psm=DEFAULT_PSM, whitelist=None):
+        config = f"--oem 3 --psm {psm}"
+        if whitelist:
+            config += f" -c tessedit_char_whitelist={whitelist}"
+        return pytesseract.image_to_data(image, output_type=Output.DICT, config=config)
+
+    def close(self):
+        pass
+
+
+class EnginePool:
+    """
+    A fixed set of OCR handles shared by the threads of one process.
+    Handles are created lazily, so idle workers never pay for model loading.
+    """
+
+    def __init__(self, size=OCR_ENGINE_POOL_SIZE):
+        self.size = max(1, size)
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def _new_engine(self):
+        if TESSEROCR_AVAILABLE:
+            return TesserocrEngine()
+        return PytesseractEngine()
+
+    def _acquire(self, timeout):
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                return self._idle.get_nowait()
+            except queue.Empty:
+                pass
+
+            with self._lock:
+                can_create = self._created < self.size
+                if can_create:
+                    self._created += 1
+            if can_create:
+                try:
+                    return self._new_engine()
+                except Exception:
+                    # Give the slot back, or failed creations would use up the pool for good
+                    with self._lock:
+                        self._created -= 1
+                    raise
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError(f"No OCR engine available after {timeout}s")
+            # Short waits, so a slot freed by a failed creation is noticed too
+            try:
+                return self._idle.get(timeout=min(remaining, 1))
+            except queue.Empty:
+                continue
+
+    @contextmanager
+    def engine(self, timeout=OCR_ENGINE_WAIT_SECONDS):
+        """Borrows a handle; blocks (up to `timeout` seconds) while all `size` handles are busy."""
+        eng = self._acquire(timeout)
+        try:
+            yield eng
+        finally:
+            self._idle.put(eng)
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+# --- PROCESS-LOCAL POOL ---
+# Worker processes are forked, so the pool is keyed by pid and rebuilt after a fork.
+_POOL = None
+_POOL_PID = None
+
+
+def get_engine_pool():
+    global _POOL, _POOL_PID
+    if _POOL is None or _POOL_PID != os.getpid():
+        _POOL = EnginePool()
+        _POOL_PID = os.getpid()
+    return _POOL
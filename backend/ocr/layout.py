@@ -1,18 +1,130 @@
 #ocr/layout.py
-def group_words_into_lines(ocr_data, min_conf=0):
-    lines = {}
-    for i, text in enumerate(ocr_data["text"]):
-        if not text.strip():
-            continue
-        y = ocr_data["top"][i]
-        line_key = y // 10
-        lines.setdefault(line_key, []).append({
-            "text": text,
-            "x": ocr_data["left"][i],
-            "y": y,
-            "w": ocr_data["width"][i]
-        })
-
-    # sort by average y (top) so we return top-to-bottom order
-    sorted_items = sorted(lines.items(), key=lambda kv: kv[0])
-    return [sorted(line_words, key=lambda w: w['x']) for _, line_words in sorted_items]
+import numpy as np
+
+from config import OCR_CONFIDENCE_THRESHOLD
+
+# Two words sit on the same line when their vertical centers are closer than
+# this fraction of the page's median glyph height.
+LINE_TOLERANCE = 0.6
+
+
+class Word:
+    """One OCR token: text plus its box's left (x), top (y) and width (w)."""
+    __slots__ = ("text", "x", "y", "w")
+
+    def __init__(self, text, x, y, w):
+        self.text = text
+        self.x = x
+        self.y = y
+        self.w = w
+
+
+class _PageColumns:
+    """The page's kept tokens, sorted by (line, x). Lines are slices of these."""
+
+    def __init__(self, texts, left, top, width, height, conf):
+        self.texts = texts
+        self.left, self.top, self.width, self.height, self.conf = left, top, width, height, conf
+        # Plain-int copies for per-word access (numpy scalars are slow to box one by one)
+        self.left_list, self.top_list, self.width_list = left.tolist(), top.tolist(), width.tolist()
+
+
+class Line:
+    """
+    One text line: a [start, end) slice of its page's column arrays
+    (struct of arrays), words sorted left to right.
+    Iterating yields Word objects, built on demand.
+    """
+    __slots__ = ("columns", "start", "end")
+
+    def __init__(self, columns, start, end):
+        self.columns = columns
+        self.start = start
+        self.end = end
+
+    def __len__(self):
+        return self.end - self.start
+
+    def __iter__(self):
+        c = self.columns
+        for i in range(self.start, self.end):
+            yield Word(c.texts[i], c.left_list[i], c.top_list[i], c.width_list[i])
+
+    @property
+    def texts(self):
+        return self.columns.texts[self.start:self.end]
+
+    @property
+    def text(self):
+        return " ".join(self.texts)
+
+    @property
+    def x(self):
+        """Left edge of the line's first word."""
+        return self.columns.left_list[self.start]
+
+    @property
+    def y(self):
+        """Top edge of the line's highest word."""
+        return int(self.top.min())
+
+    @property
+    def left(self):
+        return self.columns.left[self.start:self.end]
+
+    @property
+    def top(self):
+        return self.columns.top[self.start:self.end]
+
+    @property
+    def height(self):
+        return self.columns.height[self.start:self.end]
+
+    @property
+    def conf(self):
+        return self.columns.conf[self.start:self.end]
+
+
+def group_words_into_lines(ocr_data, min_conf=OCR_CONFIDENCE_THRESHOLD):
+    """
+    Clusters Tesseract tokens into lines, top to bottom.
+    Tokens below `min_conf` (and empty ones) are dropped first. Lines are found
+    by sorting the tokens' vertical centers and cutting wherever the gap to the
+    next token exceeds LINE_TOLERANCE x median glyph height, so a word a few
+    pixels lower than its neighbours no longer starts a new line.
+    """
+    texts = ocr_data["text"]
+    if not texts:
+        return []
+
+    n = len(texts)
+    conf = np.fromiter(ocr_data["conf"], dtype=np.float32, count=n)
+    keep = (conf >= min_conf) & np.fromiter(map(bool, map(str.strip, texts)), dtype=bool, count=n)
+    idx = np.flatnonzero(keep)
+    if idx.size == 0:
+        return []
+
+    left = np.fromiter(ocr_data["left"], dtype=np.int32, count=n)[idx]
+    top = np.fromiter(ocr_data["top"], dtype=np.int32, count=n)[idx]
+    width = np.fromiter(ocr_data["width"], dtype=np.int32, count=n)[idx]
+    height = np.fromiter(ocr_data["height"], dtype=np.int32, count=n)[idx]
+    conf = conf[idx]
+
+    # 1. Cut the sorted vertical centers into lines
+    center = top + height / 2.0
+    by_center = np.argsort(center, kind="stable")
+    tolerance = LINE_TOLERANCE * max(float(np.median(height)), 1.0)
+    breaks = np.flatnonzero(np.diff(center[by_center]) > tolerance) + 1
+    line_id = np.empty(idx.size, dtype=np.int32)
+    line_id[by_center] = np.repeat(np.arange(breaks.size + 1), np.diff(np.r_[0, breaks, idx.size]))
+
+    # 2. Order by (line, x) and slice each line out of the sorted arrays
+    order = np.lexsort((left, line_id))
+    bounds = np.r_[0, np.flatnonzero(np.diff(line_id[order])) + 1, idx.size]
+    source = idx[order].tolist()
+    columns = _PageColumns(
+        [texts[i] for i in source],
+        left[order], top[order], width[order], height[order], conf[order]
+    )
+    bounds = bounds.tolist()
+    return [Line(columns, start, end) for start, end in zip(bounds[:-1], bounds[1:])]
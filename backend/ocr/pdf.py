@@ -0,0 +1,87 @@
+#ocr/pdf.py
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pypdfium2 as pdfium
+
+from ocr.preprocess import preprocess_array
+from ocr.regions import extract_page_ocr_data
+from ocr.layout import group_words_into_lines
+from metrics.timing import timed, record_timing
+
+# --- CONFIGURATION ---
+PDF_RENDER_DPI = int(os.getenv("PDF_RENDER_DPI", "300"))
+# Pages OCR'd at the same time. This is also the number of rendered pages held
+# in memory, so a 50-page statement never has more than a few pages decoded.
+PDF_OCR_WORKERS = int(os.getenv("PDF_OCR_WORKERS", "3"))
+
+def count_pdf_pages(pdf_path):
+    pdf = pdfium.PdfDocument(str(pdf_path))
+    try:
+        return len(pdf)
+    finally:
+        pdf.close()
+
+def iter_pdf_pages(pdf_path, dpi=PDF_RENDER_DPI):
+    """Rasterizes a PDF one page at a time, yielding BGR numpy arrays in page order."""
+    pdf = pdfium.PdfDocument(str(pdf_path))
+    try:
+        for index in range(len(pdf)):
+            page = pdf[index]
+            bitmap = page.render(scale=dpi / 72)
+            # Copy out of the pdfium buffer so the bitmap can be freed right away
+            image = np.array(bitmap.to_numpy())
+            bitmap.close()
+            page.close()
+            yield image
+    finally:
+        pdf.close()
+
+def ocr_page_data(image, stats=None):
+    """Preprocess + OCR for a single page image (raw Tesseract token data)."""
+    cleaned = preprocess_array(image, stats)
+    with timed(stats, "ocr", pixels=cleaned.size):
+        return extract_page_ocr_data(cleaned)
+
+def iter_pdf_ocr_data(pdf_path, dpi=PDF_RENDER_DPI, max_workers=PDF_OCR_WORKERS, page_stats=None):
+    """
+    Fans pages out to OCR threads and yields each page's token data in page order.
+    Rendering stays on the calling thread (pdfium is not thread-safe), and a new
+    page is only rendered once a slot frees up, which keeps memory bounded.
+    Pass a list as `page_stats` to collect each page's preprocessing decisions.
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        in_flight = deque()
+        pages = iter_pdf_pages(pdf_path, dpi=dpi)
+        page_num = 0
+        while True:
+            start = time.perf_counter()
+            image = next(pages, None)
+            if image is None:
+                break
+            page_num += 1
+
+            stats = None
+            if page_stats is not None:
+                stats = {"page": page_num}
+                page_stats.append(stats)
+            # Rasterizing the page is this pipeline's "decode"
+            record_timing(stats, "decode", (time.perf_counter() - start) * 1000,
+                          pixels=image.shape[0] * image.shape[1], bytes=image.nbytes)
+            in_flight.append(pool.submit(ocr_page_data, image, stats))
+            del image
+            if len(in_flight) >= max_workers:
+                yield in_flight.popleft().result()
+
+        while in_flight:
+            yield in_flight.popleft().result()
+
+def extract_pdf_lines(pdf_path, dpi=PDF_RENDER_DPI):
+    """Merges all pages into one top-to-bottom line list for the parsers."""
+    lines = []
+    for ocr_data in iter_pdf_ocr_data(pdf_path, dpi=dpi):
+        lines.extend(group_words_into_lines(ocr_data))
+    return lines
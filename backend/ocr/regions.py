@@ -0,0 +1,122 @@
+#ocr/regions.py
+import os
+import cv2
+import numpy as np
+
+from ocr.engine import OCR_DATA_KEYS
+from ocr.tesseract_ocr import extract_ocr_data
+from ocr.cells import OCR_CELL_MODE, extract_grid_cells
+
+# --- CONFIGURATION ---
+OCR_TABLE_REGIONS = os.getenv("OCR_TABLE_REGIONS", "1") == "1"
+REGION_PADDING = 12           # px kept around each crop so edge glyphs are not clipped
+MAX_REGION_COVERAGE = 0.85    # if the crops cover more than this, just OCR the page
+
+
+def find_ruling_lines(binary):
+    """
+    Returns (horizontal, vertical) masks of the table ruling lines.
+    `binary` is the preprocessed page: black ink on a white background.
+    """
+    ink = cv2.bitwise_not(binary)
+    h, w = ink.shape[:2]
+
+    # A line is a run of ink much longer than any glyph in that direction
+    horiz_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (max(w // 30, 10), 1))
+    vert_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (1, max(h // 30, 10)))
+    horizontal = cv2.morphologyEx(ink, cv2.MORPH_OPEN, horiz_kernel)
+    vertical = cv2.morphologyEx(ink, cv2.MORPH_OPEN, vert_kernel)
+    return horizontal, vertical
+
+
+def _largest_box(mask):
+    contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    if not contours:
+        return None
+    return cv2.boundingRect(max(contours, key=cv2.contourArea))
+
+
+def detect_table_box(binary, ruling=None):
+    """Bounding box (x, y, w, h) of the item table, from ruling lines or text density."""
+    h, w = binary.shape[:2]
+
+    # 1. Ruled tables: the grid is the union of horizontal and vertical lines
+    horizontal, vertical = ruling or find_ruling_lines(binary)
+    grid = cv2.bitwise_or(horizontal, vertical)
+    grid = cv2.dilate(grid, np.ones((5, 5), np.uint8))
+    box = _largest_box(grid)
+    if box and box[2] > w * 0.3 and box[3] > h * 0.05:
+        return box
+
+    # 2. Unruled tables: merge words into blocks and keep the densest, largest one
+    ink = cv2.bitwise_not(binary)
+    block_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (max(w // 25, 15), max(h // 60, 5)))
+    blocks = cv2.dilate(ink, block_kernel)
+    return _largest_box(blocks)
+
+
+def detect_regions(binary, ruling=None):
+    """
+    Returns the crops worth sending to Tesseract, top to bottom:
+    the table itself and the footer band below it (totals + signatures).
+    Returns None when the page should be OCR'd whole.
+    """
+    h, w = binary.shape[:2]
+    table = detect_table_box(binary, ruling)
+    if table is None:
+        return None
+
+    x, y, tw, th = table
+    regions = [(x, y, tw, th)]
+
+    # Footer: everything between the table and the last row of ink
+    ink_rows = np.flatnonzero((binary[y + th:] < 128).any(axis=1))
+    if ink_rows.size:
+        footer_top = y + th + int(ink_rows[0])
+        footer_bottom = y + th + int(ink_rows[-1]) + 1
+        regions.append((0, footer_top, w, footer_bottom - footer_top))
+
+    padded = []
+    for rx, ry, rw, rh in regions:
+        x0, y0 = max(rx - REGION_PADDING, 0), max(ry - REGION_PADDING, 0)
+        x1, y1 = min(rx + rw + REGION_PADDING, w), min(ry + rh + REGION_PADDING, h)
+        padded.append((x0, y0, x1 - x0, y1 - y0))
+
+    covered = sum(rw * rh for _, _, rw, rh in padded)
+    if covered > MAX_REGION_COVERAGE * w * h:
+        return None
+    return padded
+
+
+def extract_region_ocr_data(binary, regions):
+    """OCRs each crop and merges the tokens back into page coordinates."""
+    merged = {key: [] for key in OCR_DATA_KEYS}
+    for x, y, w, h in regions:
+        data = extract_ocr_data(binary[y:y + h, x:x + w])
+        data["left"] = [left + x for left in data["left"]]
+        data["top"] = [top + y for top in data["top"]]
+        for key, values in data.items():
+            merged.setdefault(key, []).extend(values)
+    return merged
+
+
+def extract_page_ocr_data(binary):
+    """
+    Page-level entry point: OCR only the table/footer crops when we can find them.
+    On a ruled table the grid is read cell by cell and attached under "grid";
+    the returned tokens then only cover the footer band.
+    """
+    ruling = find_ruling_lines(binary) if (OCR_TABLE_REGIONS or OCR_CELL_MODE) else None
+
+    grid = extract_grid_cells(binary, *ruling) if OCR_CELL_MODE else None
+    if grid:
+        regions = detect_regions(binary, ruling)
+        # Totals/signatures below the grid still go through the token path
+        data = extract_region_ocr_data(binary, regions[1:]) if regions else extract_ocr_data(binary)
+        data["grid"] = grid
+        return data
+
+    regions = detect_regions(binary, ruling) if OCR_TABLE_REGIONS else None
+    if not regions:
+        return extract_ocr_data(binary)
+    return extract_region_ocr_data(binary, regions)
@@ -1,15 +1,7 @@
 #ocr/tesseract_ocr.py
-import pytesseract
-from pytesseract import Output
+from ocr.engine import get_engine_pool, DEFAULT_PSM
 
-# Point to the NATIVE apt installation, not the Snap one
-pytesseract.pytesseract.tesseract_cmd = r'/usr/bin/tesseract'
-
-def extract_ocr_data(image):
-    # This will now work because the apt version has access to /tmp
-    data = pytesseract.image_to_data(
-        image,
-        output_type=Output.DICT,
-        config="--oem 3 --psm 4"
-    )
-    return data
\ No newline at end of file
+def extract_ocr_data(image, psm=DEFAULT_PSM, whitelist=None):
+    # Borrow a warm Tesseract handle instead of forking /usr/bin/tesseract per image
+    with get_engine_pool().engine() as engine:
+        return engine.recognize(image, psm=psm, whitelist=whitelist)
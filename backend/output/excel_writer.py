@@ -1,124 +1,187 @@
 #output/excel_writer.py
-import re
-import os
 import json
 from pathlib import Path
 from openpyxl import Workbook
-from openpyxl.styles import Font, Alignment, PatternFill
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, Alignment, PatternFill, NamedStyle
 
 # --- STYLING CONSTANTS ---
 LOCK_FILL = PatternFill(start_color="FFCCCC", end_color="FFCCCC", fill_type="solid")
 OK_FILL = PatternFill(start_color="CCFFCC", end_color="CCFFCC", fill_type="solid")
 ORANGE_FILL = PatternFill(start_color="FFE5CC", end_color="FFE5CC", fill_type="solid")
 YELLOW_FILL = PatternFill(start_color="FFFFCC", end_color="FFFFCC", fill_type="solid")
+GREY_FILL = PatternFill(start_color="E0E0E0", end_color="E0E0E0", fill_type="solid")
+AMOUNT_FORMAT = '#,##0.00'
+
+# Row colour by Review_Status (anything else is left unfilled)
+STATUS_FILLS = {
+    "CHECK_AMOUNT": LOCK_FILL,
+    "CHECK_OCR": ORANGE_FILL,
+    "CHECK_TOTAL": YELLOW_FILL,
+}
+
+COLUMNS = ["Name", "Telephone", "Service", "Amount", "Sign", "Review_Status"]
+WIDTHS = [25, 18, 35, 15, 10, 20]
+
+# Excel refuses cells longer than 32,767 characters: the METADATA json is split across row 2
+METADATA_CHUNK_CHARS = 32000
+
+
+def _named_styles():
+    """
+    One NamedStyle per distinct look, registered once per workbook, so cells
+    share a style id instead of each carrying its own Font/Fill objects.
+    """
+    styles = [
+        NamedStyle(name="invoice_title", font=Font(bold=True, size=12)),
+        NamedStyle(name="audit_bold", font=Font(bold=True)),
+        NamedStyle(name="audit_ok", font=Font(bold=True), fill=OK_FILL),
+        NamedStyle(name="audit_lock", font=Font(bold=True), fill=LOCK_FILL),
+        NamedStyle(name="table_header", font=Font(bold=True), fill=GREY_FILL,
+                   alignment=Alignment(horizontal="center")),
+        NamedStyle(name="calculated_total", font=Font(bold=True), fill=OK_FILL, number_format=AMOUNT_FORMAT),
+        NamedStyle(name="row_amount", number_format=AMOUNT_FORMAT),
+    ]
+    for status, fill in STATUS_FILLS.items():
+        styles.append(NamedStyle(name=f"row_{status}", fill=fill))
+        styles.append(NamedStyle(name=f"row_{status}_amount", fill=fill, number_format=AMOUNT_FORMAT))
+    return styles
+
+
+def _cell(ws, value, style=None):
+    """A styled cell for ws.append(); unstyled values are appended as-is (cheaper)."""
+    if not style:
+        return value
+    cell = WriteOnlyCell(ws, value=value)
+    cell.style = style
+    return cell
+
+
+def _text_cell(ws, value):
+    """
+    A cell that is always stored as text. openpyxl turns strings starting with
+    "=" into formulas, and a METADATA chunk can start anywhere in the json.
+    """
+    cell = WriteOnlyCell(ws, value=value)
+    cell.data_type = "s"
+    return cell
+
+
+def parse_amount(val):
+    """Amount as a float (currency symbols/commas removed), or None if it isn't a number."""
+    try:
+        return float(str(val).replace(",", "").replace("$", ""))
+    except:
+        return None
+
+
+def read_original_rows(ws_meta):
+    """The original_json list from a METADATA sheet, whether chunked (B2, C2...) or in one cell."""
+    for values in ws_meta.iter_rows(min_row=2, max_row=2, values_only=True):
+        return json.loads("".join(v for v in values[1:] if v))
+    return []
+
+
+def write_excel(header_lines, rows, footer, filename, invoice_status=None, review_reasons=None,
+                tenant_id="default_tenant", evaluator=None):
+    """
+    Renders the audit workbook. `rows` is consumed once, so it can be the parser's
+    row generator. With an `evaluator` (review.invoice_review.InvoiceEvaluator fed
+    by that stream) the status is taken from it once the last row is written;
+    the audit summary therefore sits below the table.
+    Uses openpyxl's write-only mode: rows go straight to the sheet's XML stream.
+    Returns the number of rows written.
+    """
+    # ALIGNMENT STEP: Ensure the target directory exists (`filename` may also be a file object)
+    if isinstance(filename, (str, Path)):
+        Path(filename).parent.mkdir(parents=True, exist_ok=True)
+
+    wb = Workbook(write_only=True)
+    for style in _named_styles():
+        wb.add_named_style(style)
 
-def write_excel(header_lines, rows, footer, filename, invoice_status=None, review_reasons=None, tenant_id="default_tenant"):
-    # ALIGNMENT STEP: Ensure the target directory exists
-    Path(filename).parent.mkdir(parents=True, exist_ok=True)
-
-    wb = Workbook()
-    
     # --- SHEET 1: THE AUDIT (User Facing) ---
-    ws = wb.active
-    ws.title = "Invoice Audit"
+    ws = wb.create_sheet("Invoice Audit")
+
+    # Column widths must be set before the first row is streamed
+    for i, width in enumerate(WIDTHS, start=1):
+        ws.column_dimensions[chr(64+i)].width = width
 
     current_row = 1
 
     # --- 1. INVOICE HEADER ---
+    # Write-only sheets can't merge cells; the text simply overflows to the right
     for line in header_lines:
-        ws.merge_cells(start_row=current_row, start_column=1, end_row=current_row, end_column=6)
-        cell = ws.cell(row=current_row, column=1, value=line)
-        cell.font = Font(bold=True, size=12)
-        current_row += 1
-
-    current_row += 1 
-
-    # --- 2. AUDIT SUMMARY ---
-    if invoice_status:
-        ws.merge_cells(start_row=current_row, start_column=1, end_row=current_row, end_column=6)
-        cell = ws.cell(row=current_row, column=1, value=f"SYSTEM STATUS: {invoice_status}")
-        cell.font = Font(bold=True)
-        cell.fill = OK_FILL if invoice_status == "OK" else LOCK_FILL
-        current_row += 1
-
-        if review_reasons:
-            for reason in review_reasons:
-                ws.merge_cells(start_row=current_row, start_column=1, end_row=current_row, end_column=6)
-                ws.cell(row=current_row, column=1, value=f"• {reason}")
-                current_row += 1
+        ws.append([_cell(ws, line, "invoice_title")])
         current_row += 1
 
-    # --- 3. TABLE HEADERS ---
-    columns = ["Name", "Telephone", "Service", "Amount", "Sign", "Review_Status"]
-    for col_idx, col_name in enumerate(columns, start=1):
-        cell = ws.cell(row=current_row, column=col_idx, value=col_name)
-        cell.font = Font(bold=True)
-        cell.alignment = Alignment(horizontal="center")
-        cell.fill = PatternFill(start_color="E0E0E0", end_color="E0E0E0", fill_type="solid")
+    ws.append([])
+    current_row += 1
 
+    # --- 2. TABLE HEADERS ---
+    ws.append([_cell(ws, col_name, "table_header") for col_name in COLUMNS])
     current_row += 1
 
-    # --- 4. TABLE ROWS ---
+    # --- 3. TABLE ROWS ---
+    start_data_row = current_row
+    original_rows = []
     for row in rows:
+        original_rows.append(json.dumps(row.to_dict()))
+        # rows are parser.models.InvoiceRow; .get() reads them by column name
         status = row.get("Review_Status", "OK")
-        for col_idx, col_name in enumerate(columns, start=1):
+        style = f"row_{status}" if status in STATUS_FILLS else None
+
+        cells = []
+        for col_name in COLUMNS:
             val = row.get(col_name, "")
-            
+
             # Smart Number Handling for Amount Column
             if col_name == "Amount":
-                try:
-                    # Remove currency symbols/commas to store as float
-                    clean_val = float(str(val).replace(",", "").replace("$", ""))
-                    cell = ws.cell(row=current_row, column=col_idx, value=clean_val)
-                    cell.number_format = '#,##0.00'
-                except:
-                    cell = ws.cell(row=current_row, column=col_idx, value=val)
-            else:
-                cell = ws.cell(row=current_row, column=col_idx, value=val)
-            
-            # Apply Colors
-            if status == "CHECK_AMOUNT":
-                cell.fill = LOCK_FILL
-            elif status == "CHECK_OCR":
-                cell.fill = ORANGE_FILL
-            elif status == "CHECK_TOTAL":
-                cell.fill = YELLOW_FILL
+                amount = parse_amount(val)
+                if amount is not None:
+                    cells.append(_cell(ws, amount, f"{style}_amount" if style else "row_amount"))
+                    continue
+            cells.append(_cell(ws, val, style))
+        ws.append(cells)
         current_row += 1
+    row_count = current_row - start_data_row
 
-    # --- 5. TOTALS SECTION ---
+    # --- 4. TOTALS SECTION ---
+    ws.append([])
     current_row += 1
-    ws.cell(row=current_row, column=3, value="CALCULATED TOTAL:").font = Font(bold=True)
-    
+
     # Use Excel Formula for Totaling (Better than manual sum)
-    total_cell = ws.cell(row=current_row, column=4)
-    start_data_row = current_row - len(rows)
-    end_data_row = current_row - 1
-    total_cell.value = f"=SUM(D{start_data_row}:D{end_data_row})"
-    total_cell.font = Font(bold=True)
-    total_cell.fill = OK_FILL
-    total_cell.number_format = '#,##0.00'
-    
+    ws.append([
+        None, None,
+        _cell(ws, "CALCULATED TOTAL:", "audit_bold"),
+        _cell(ws, f"=SUM(D{start_data_row}:D{current_row - 2})", "calculated_total")
+    ])
+    ws.append([])
     current_row += 2
 
+    # --- 5. AUDIT SUMMARY ---
+    if evaluator is not None:
+        invoice_status, review_reasons = evaluator.result()
+    if invoice_status:
+        ws.append([_cell(ws, f"SYSTEM STATUS: {invoice_status}",
+                         "audit_ok" if invoice_status == "OK" else "audit_lock")])
+        for reason in review_reasons or []:
+            ws.append([f"• {reason}"])
+        ws.append([])
+
     # --- 6. FOOTER ---
     for key, value in footer.items():
-        ws.cell(row=current_row, column=1, value=f"{key}:")
-        ws.cell(row=current_row, column=2, value=str(value))
-        current_row += 1
-
-    # --- 7. COLUMN WIDTHS ---
-    widths = [25, 18, 35, 15, 10, 20]
-    for i, width in enumerate(widths, start=1):
-        ws.column_dimensions[chr(64+i)].width = width
+        ws.append([f"{key}:", str(value)])
 
-    # --- 8. NEW FEATURE: HIDDEN METADATA SHEET ---
+    # --- 7. NEW FEATURE: HIDDEN METADATA SHEET ---
     # We save a copy of the original data and tenant_id here
     # This makes learning via excel_diff.py much more accurate
     ws_meta = wb.create_sheet("METADATA")
     ws_meta.sheet_state = 'hidden'
-    ws_meta.cell(row=1, column=1, value="tenant_id")
-    ws_meta.cell(row=1, column=2, value=tenant_id)
-    ws_meta.cell(row=2, column=1, value="original_json")
-    ws_meta.cell(row=2, column=2, value=json.dumps(rows))
+    ws_meta.append(["tenant_id", tenant_id])
+    payload = "[" + ", ".join(original_rows) + "]"
+    chunks = [payload[i:i + METADATA_CHUNK_CHARS] for i in range(0, len(payload), METADATA_CHUNK_CHARS)]
+    ws_meta.append(["original_json"] + [_text_cell(ws_meta, chunk) for chunk in chunks])
 
-    wb.save(filename)
\ No newline at end of file
+    wb.save(filename)
+    return row_count
@@ -0,0 +1,77 @@
+#output/results.py
+import io
+import os
+import csv
+import json
+import hashlib
+
+from storage.cache import ContentCache
+from tenants.manager import BASE_DIR
+from parser.models import InvoiceRow
+from output.excel_writer import write_excel
+
+# --- CONFIGURATION ---
+RENDERED_CACHE_MAX_MB = int(os.getenv("RENDERED_CACHE_MAX_MB", "256"))
+
+# Bump whenever a renderer changes its output, so cached files are rebuilt
+RENDER_VERSION = 1
+
+# format -> media type for the download response
+RESULT_FORMATS = {
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "csv": "text/csv",
+    "json": "application/json",
+}
+
+RENDERED_CACHE = ContentCache(
+    BASE_DIR / "runtime" / "cache" / "rendered", max_bytes=RENDERED_CACHE_MAX_MB * 1024 * 1024
+)
+
+
+def _render_xlsx(result):
+    buffer = io.BytesIO()
+    write_excel(
+        [],
+        (InvoiceRow.from_dict(row) for row in result["line_items"]),
+        result["footer"] or {},
+        buffer,
+        invoice_status=result["status"],
+        review_reasons=result["review_reasons"],
+        tenant_id=result["tenant_id"]
+    )
+    return buffer.getvalue()
+
+def _render_csv(result):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=list(InvoiceRow.COLUMNS), extrasaction="ignore")
+    writer.writeheader()
+    writer.writerows(result["line_items"])
+    return buffer.getvalue().encode("utf-8")
+
+def _render_json(result):
+    return json.dumps({
+        "job_id": str(result["job_id"]),
+        "status": result["status"],
+        "company_name": result["company_name"],
+        "rows": result["line_items"],
+        "footer": result["footer"],
+        "review_reasons": result["review_reasons"],
+    }).encode("utf-8")
+
+RENDERERS = {"xlsx": _render_xlsx, "csv": _render_csv, "json": _render_json}
+
+
+def render_result(result, fmt):
+    """
+    Bytes of a stored job result (a job_results row) in `fmt`.
+    Rendered files are cached on disk, keyed by job, format and the result's
+    updated_at, so a re-processed job never serves a stale file.
+    """
+    key = hashlib.sha256(
+        f"{result['job_id']}:{fmt}:{result['updated_at']}:{RENDER_VERSION}".encode("utf-8")
+    ).hexdigest()
+    data = RENDERED_CACHE.get_bytes(key)
+    if data is None:
+        data = RENDERERS[fmt](result)
+        RENDERED_CACHE.put_bytes(key, data)
+    return data
@@ -0,0 +1,103 @@
+#parser/classifier.py
+import threading
+
+from config import HEADER_KEYWORDS, HEADER_MIN_COLUMNS, ROW_STOP_KEYWORDS, SIGNATURE_KEYWORDS, TOTAL_KEYWORDS
+from memory.aho_corasick import SubstringAutomaton
+from memory.corrections import get_compiled_memory
+
+# Line tags
+HEADER = "header"
+ITEM = "item"
+TOTAL = "total"
+SIGNATURE = "footer-signature"
+NOISE = "noise"
+
+
+class LineTag:
+    """What the classifier learned about one OCR line. Parser stages read these flags."""
+
+    def __init__(self, text, tag, header_columns, stop, total, signatures):
+        self.text = text                        # words joined with spaces (original case)
+        self.tag = tag                          # HEADER / ITEM / TOTAL / SIGNATURE / NOISE
+        self.header_columns = header_columns    # header column groups present on the line
+        self.stop = stop                        # has a ROW_STOP_KEYWORDS word: the item table ends here
+        self.total = total                      # has a TOTAL_KEYWORDS word
+        self.signatures = signatures            # SIGNATURE_KEYWORDS present, in keyword order
+
+
+class LineClassifier:
+    """
+    Every keyword list compiled into one substring automaton, so a line is
+    lower-cased and scanned once no matter how many keywords there are.
+    `overrides` (from tenant memory) extends the config lists:
+        {"header": {"amount": ["montant"]}, "stop": [...], "total": [...], "signature": [...]}
+    """
+
+    def __init__(self, overrides=None):
+        overrides = overrides or {}
+        header = {column: list(words) for column, words in HEADER_KEYWORDS.items()}
+        for column, words in overrides.get("header", {}).items():
+            header.setdefault(column, []).extend(words)
+        self.signature_keywords = [k.lower() for k in SIGNATURE_KEYWORDS + overrides.get("signature", [])]
+
+        patterns, meanings = [], []
+        def add(words, kind, value=None):
+            for word in words:
+                patterns.append(word.lower())
+                meanings.append((kind, value or word.lower()))
+
+        for column, words in header.items():
+            add(words, "header", column)
+        add(ROW_STOP_KEYWORDS + overrides.get("stop", []), "stop")
+        add(TOTAL_KEYWORDS + overrides.get("total", []), "total")
+        add(self.signature_keywords, "signature")
+
+        self.meanings = meanings
+        self.automaton = SubstringAutomaton(patterns)
+
+    def classify_text(self, text):
+        columns, signatures = set(), set()
+        stop = total = False
+        for index in self.automaton.find_all(text.lower()):
+            kind, value = self.meanings[index]
+            if kind == "header":
+                columns.add(value)
+            elif kind == "stop":
+                stop = True
+            elif kind == "total":
+                total = True
+            else:
+                signatures.add(value)
+
+        if len(columns) >= HEADER_MIN_COLUMNS:
+            tag = HEADER
+        elif stop or total:
+            tag = TOTAL
+        elif signatures:
+            tag = SIGNATURE
+        elif any(c.isalnum() for c in text):
+            tag = ITEM
+        else:
+            tag = NOISE
+        ordered = [k for k in self.signature_keywords if k in signatures]
+        return LineTag(text, tag, len(columns), stop, total, ordered)
+
+    def classify(self, lines):
+        """One LineTag per ocr.layout.Line, in order."""
+        return [self.classify_text(line.text) for line in lines]
+
+
+# tenant_id -> (CompiledMemory it was built from, LineClassifier)
+_CLASSIFIERS = {}
+_CLASSIFIERS_LOCK = threading.Lock()
+
+def get_line_classifier(tenant_id="default_tenant"):
+    """The tenant's classifier, rebuilt only when its memory (and so its overrides) changes."""
+    memory = get_compiled_memory(tenant_id)
+    cached = _CLASSIFIERS.get(tenant_id)
+    if cached and cached[0] is memory:
+        return cached[1]
+    with _CLASSIFIERS_LOCK:
+        classifier = LineClassifier(memory.raw.get("keywords"))
+        _CLASSIFIERS[tenant_id] = (memory, classifier)
+    return classifier
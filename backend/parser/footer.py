@@ -1,22 +1,21 @@
 #parser/footer.py
-def extract_footer(lines):
+from parser.classifier import get_line_classifier
+
+def extract_footer(lines, tags=None, tenant_id="default_tenant"):
+    if tags is None:
+        tags = get_line_classifier(tenant_id).classify(lines)
     footer_data = {}
-    keywords = ["requested", "approved", "authorized"]
     
-    for i, line in enumerate(lines):
-        line_text = " ".join(w["text"] for w in line).lower()
-        
-        for key in keywords:
-            if key in line_text:
-                # 1. Capture the current line
-                current_val = " ".join(w["text"] for w in line)
+    for i, tag in enumerate(tags):
+        # Signature labels (config.SIGNATURE_KEYWORDS) found on this line
+        for key in tag.signatures:
+            # 1. Capture the current line
+            current_val = tag.text
+            
+            # 2. Lookahead: Check the next line for the actual name/signature
+            # This handles cases where the name is below the label
+            next_val = tags[i + 1].text if i + 1 < len(tags) else ""
+            
+            footer_data[key] = f"{current_val} | Follow-up: {next_val}"
                 
-                # 2. Lookahead: Check the next line for the actual name/signature
-                # This handles cases where the name is below the label
-                next_val = ""
-                if i + 1 < len(lines):
-                    next_val = " ".join(w["text"] for w in lines[i+1])
-                
-                footer_data[key] = f"{current_val} | Follow-up: {next_val}"
-                
-    return footer_data
\ No newline at end of file
+    return footer_data
@@ -0,0 +1,41 @@
+#parser/models.py
+
+class InvoiceRow:
+    """
+    One parsed table row. Slotted: a large statement holds thousands of these
+    per worker, so no per-row __dict__. Convert with to_dict() only at the
+    edges (JSON caches, the Excel METADATA sheet, API responses).
+    """
+    __slots__ = ("name", "telephone", "service", "amount", "review_status")
+
+    # Excel / JSON column name -> attribute
+    COLUMNS = {
+        "Name": "name",
+        "Telephone": "telephone",
+        "Service": "service",
+        "Amount": "amount",
+        "Review_Status": "review_status",
+    }
+
+    def __init__(self, name="", telephone="", service="", amount="", review_status=None):
+        self.name = name
+        self.telephone = telephone
+        self.service = service
+        self.amount = amount
+        self.review_status = review_status
+
+    def get(self, column, default=""):
+        """Value by Excel column name ("Name", "Amount"...); unknown columns give `default`."""
+        attr = self.COLUMNS.get(column)
+        value = getattr(self, attr) if attr else None
+        return default if value is None else value
+
+    def to_dict(self):
+        return {column: getattr(self, attr) for column, attr in self.COLUMNS.items()}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**{attr: data.get(column, "") for column, attr in cls.COLUMNS.items()})
+
+    def __repr__(self):
+        return f"InvoiceRow({self.to_dict()!r})"
@@ -29,15 +29,15 @@ def is_noisy(text):
 
 def assign_review_status(row):
     """
-    Determines whether a row is safe or needs review.
+    Determines whether an InvoiceRow is safe or needs review.
     """
 
     # 1️⃣ OCR noise in critical text fields
-    if is_noisy(row.get("Name", "")) or is_noisy(row.get("Service", "")):
+    if is_noisy(row.name) or is_noisy(row.service):
         return "CHECK_OCR"
 
     # 2️⃣ Amount validation
-    normalized = normalize_amount(row.get("Amount", ""))
+    normalized = normalize_amount(row.amount)
     if normalized is None:
         return "CHECK_AMOUNT"
 
@@ -1,7 +1,10 @@
 import re
+from config import COLUMN_SYNONYMS
 from parser.review import assign_review_status
-from memory.corrections import load_memory, apply_known_fixes
-from tenants.manager import get_tenant_paths
+from memory.corrections import get_compiled_memory
+from parser.classifier import get_line_classifier
+from parser.models import InvoiceRow
+from metrics.timing import timed
 
 def is_amount(token):
     """Clean amount detection using regex to handle currency and separators."""
@@ -17,47 +20,50 @@ def near(x1, x2, tolerance=40):
     if x1 is None or x2 is None: return False
     return abs(x1 - x2) <= tolerance
 
-def parse_table(lines, header_index, header_line, tenant_id="default_tenant"):
-    """
-    Parses structured tables using identified headers and tenant-specific memory.
-    """
-    # 1. LOAD TENANT-SPECIFIC MEMORY
-    paths = get_tenant_paths(tenant_id)
-    memory = load_memory(paths["memory"])
-    
+def header_columns(header_line):
+    """Maps header text to canonical keys (COLUMN_SYNONYMS) -> horizontal position (x)."""
     columns = {}
-    synonyms = {
-        "name": ["client", "customer", "name", "patient"], 
-        "service": ["description", "item", "product", "service", "details"], 
-        "amount": ["price", "total", "cost", "amount", "charge"]
-    }
-    
-    # Map header text to canonical keys based on horizontal position (x)
     for word in header_line:
-        text = word["text"].lower()
+        text = word.text.lower()
         found_key = text
-        for key, aliases in synonyms.items():
+        for key, aliases in COLUMN_SYNONYMS.items():
             if text in aliases:
                 found_key = key
-        columns[found_key] = word["x"]
+        columns[found_key] = word.x
+    return columns
 
-    rows = []
-    for line in lines[header_index + 1:]:
-        full_line_text = " ".join([w["text"] for w in line]).lower()
-        
+def iter_table_rows(lines, header_index, header_line, tenant_id="default_tenant", stats=None, tags=None, template=None):
+    """
+    Parses structured tables using identified headers and tenant-specific memory.
+    Yields each InvoiceRow (memory fixes and review status applied) as soon as its line is read.
+    `tags` are the LineTags of `lines` (parser/classifier.py); computed if omitted.
+    With a learned `template` (parser/templates.py) the column positions come from
+    it instead of the header words; the proximity rule is the same either way.
+    """
+    # 1. LOAD TENANT-SPECIFIC MEMORY (cached per process)
+    memory = get_compiled_memory(tenant_id)
+    if tags is None:
+        tags = get_line_classifier(tenant_id).classify(lines)
+    
+    if template is not None:
+        columns = template.header_columns(template.shift(header_line))
+    else:
+        columns = header_columns(header_line)
+
+    for line, tag in zip(lines[header_index + 1:], tags[header_index + 1:]):
         # 🟢 STOP LOGIC: Prevent parsing totals/tax as line items
-        if any(kw in full_line_text for kw in ["total", "subtotal", "tax", "amount due"]): 
+        if tag.stop:
             break
 
         row_data = {"name": [], "service": [], "amount": []}
         for word in line:
-            x_pos = word["x"]
+            x_pos = word.x
             if near(x_pos, columns.get("name")):
-                row_data["name"].append(word["text"])
+                row_data["name"].append(word.text)
             elif near(x_pos, columns.get("service")):
-                row_data["service"].append(word["text"])
+                row_data["service"].append(word.text)
             elif near(x_pos, columns.get("amount")):
-                row_data["amount"].append(word["text"])
+                row_data["amount"].append(word.text)
 
         # Capture raw strings for comparison to detect AI modifications
         raw_name = " ".join(row_data["name"]).strip()
@@ -67,44 +73,40 @@ def parse_table(lines, header_index, header_line, tenant_id="default_tenant"):
         if not any([raw_name, raw_service, raw_amount]):
             continue
 
-        row = {
-            "Name": raw_name,
-            "Telephone": "", 
-            "Service": raw_service,
-            "Amount": raw_amount
-        }
+        row = InvoiceRow(name=raw_name, service=raw_service, amount=raw_amount)
         
         # --- APPLY AI FIXES ---
-        row = apply_known_fixes(row, memory)
+        with timed(stats, "memory_fixes"):
+            row = memory.apply(row)
         
         # --- FLAG AUTO-CORRECTIONS ---
         # Mark as 'AUTO_FIXED' if memory changed any value
-        if row["Name"] != raw_name or row["Service"] != raw_service or row["Amount"] != raw_amount:
-            row["Review_Status"] = "AUTO_FIXED"
+        if row.name != raw_name or row.service != raw_service or row.amount != raw_amount:
+            row.review_status = "AUTO_FIXED"
         else:
-            row["Review_Status"] = assign_review_status(row)
+            row.review_status = assign_review_status(row)
             
-        rows.append(row)
-    return rows
+        yield row
+
+def parse_table(lines, header_index, header_line, tenant_id="default_tenant", stats=None, tags=None, template=None):
+    """iter_table_rows() collected into a list."""
+    return list(iter_table_rows(lines, header_index, header_line, tenant_id, stats, tags, template))
 
-def parse_implicit_table(lines, tenant_id="default_tenant"):
+def iter_implicit_table_rows(lines, tenant_id="default_tenant", stats=None, tags=None):
     """
     Parses tables without clear headers by identifying amount-like tokens.
+    Yields rows one by one, ending with a TOTAL row if the invoice prints one.
     """
-    paths = get_tenant_paths(tenant_id)
-    memory = load_memory(paths["memory"])
-    rows = []
+    memory = get_compiled_memory(tenant_id)
+    if tags is None:
+        tags = get_line_classifier(tenant_id).classify(lines)
 
-    for line in lines:
-        words = [w["text"] for w in line if w["text"].strip()]
+    for line, tag in zip(lines, tags):
+        words = [text for text in line.texts if text.strip()]
         if not words: continue
 
-        full_text = " ".join(words).lower()
-        if "total" in full_text:
-            rows.append({
-                "Name": "TOTAL", "Telephone": "", "Service": "", 
-                "Amount": " ".join(words), "Review_Status": "CHECK_TOTAL"
-            })
+        if tag.total:
+            yield InvoiceRow(name="TOTAL", amount=" ".join(words), review_status="CHECK_TOTAL")
             break
 
         amount = None
@@ -120,22 +122,77 @@ def parse_implicit_table(lines, tenant_id="default_tenant"):
         amount_index = words.index(amount)
         raw_service = " ".join(words[1:amount_index])
 
-        row = {
-            "Name": raw_name,
-            "Telephone": "",
-            "Service": raw_service,
-            "Amount": amount
-        }
+        row = InvoiceRow(name=raw_name, service=raw_service, amount=amount)
 
         # --- APPLY AI FIXES ---
-        row = apply_known_fixes(row, memory)
+        with timed(stats, "memory_fixes"):
+            row = memory.apply(row)
 
         # --- FLAG AUTO-CORRECTIONS ---
-        if row["Name"] != raw_name or row["Service"] != raw_service or row["Amount"] != amount:
-            row["Review_Status"] = "AUTO_FIXED"
+        if row.name != raw_name or row.service != raw_service or row.amount != amount:
+            row.review_status = "AUTO_FIXED"
         else:
-            row["Review_Status"] = assign_review_status(row)
+            row.review_status = assign_review_status(row)
         
-        rows.append(row)
+        yield row
+
+def parse_implicit_table(lines, tenant_id="default_tenant", stats=None, tags=None):
+    """iter_implicit_table_rows() collected into a list."""
+    return list(iter_implicit_table_rows(lines, tenant_id, stats, tags))
+
+def iter_grid_table_rows(grids, tenant_id="default_tenant", stats=None):
+    """
+    Parses tables that were OCR'd cell by cell (see ocr/cells.py), yielding rows grid by grid.
+    Columns come straight from the grid, so no x-proximity guessing is needed.
+    `grids` is one grid per page; pages without a readable header reuse the
+    previous page's columns (continuation pages of long statements).
+    """
+    memory = get_compiled_memory(tenant_id)
+    classifier = get_line_classifier(tenant_id)
+    columns = None
+
+    for grid in grids:
+        if any(grid["columns"]):
+            columns = grid["columns"]
+            body = grid["cells"]
+        else:
+            # No recognizable header: the first grid row is data
+            body = [grid["header"]] + grid["cells"]
+        if columns is None:
+            continue
 
-    return rows 
\ No newline at end of file
+        for cells in body:
+            values = {key: text.strip() for key, text in zip(columns, cells) if key}
+            # 🟢 STOP LOGIC: Prevent parsing totals/tax as line items
+            if classifier.classify_text(" ".join(cells)).stop:
+                return
+
+            raw_name = values.get("name", "")
+            raw_service = values.get("service", "")
+            raw_amount = values.get("amount", "")
+
+            if not any([raw_name, raw_service, raw_amount]):
+                continue
+
+            row = InvoiceRow(
+                name=raw_name,
+                telephone=values.get("telephone", ""),
+                service=raw_service,
+                amount=raw_amount
+            )
+
+            # --- APPLY AI FIXES ---
+            with timed(stats, "memory_fixes"):
+                row = memory.apply(row)
+
+            # --- FLAG AUTO-CORRECTIONS ---
+            if row.name != raw_name or row.service != raw_service or row.amount != raw_amount:
+                row.review_status = "AUTO_FIXED"
+            else:
+                row.review_status = assign_review_status(row)
+
+            yield row
+
+def parse_grid_table(grids, tenant_id="default_tenant", stats=None):
+    """iter_grid_table_rows() collected into a list."""
+    return list(iter_grid_table_rows(grids, tenant_id, stats))
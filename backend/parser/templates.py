@@ -0,0 +1,146 @@
+#parser/templates.py
+import os
+import re
+import json
+import time
+import tempfile
+import threading
+from datetime import datetime
+
+from tenants.manager import get_tenant_paths
+from parser.classifier import SIGNATURE
+from memory.corrections import memory_lock
+
+# --- CONFIGURATION ---
+LAYOUT_TEMPLATES = os.getenv("LAYOUT_TEMPLATES", "1") == "1"
+MAX_TEMPLATES_PER_TENANT = 20
+TEMPLATE_RECHECK_SECONDS = 5     # same idea as MEMORY_RECHECK_SECONDS
+FOOTER_SLACK = 20                # px: footer lines may start a little above the learned offset
+
+
+def anchor_key(text):
+    """Header text reduced to what survives OCR noise: lower-case letters and single spaces."""
+    return " ".join(re.sub(r"[^a-z ]", " ", text.lower()).split())
+
+
+class LayoutTemplate:
+    """
+    A learned invoice layout: the header line's text (anchor), the left edge of
+    each header column, and where the footer starts relative to the header.
+    Words are assigned to columns exactly as on the run that learned it
+    (parser/table.py), so a cached template never changes the parsed rows.
+    """
+
+    def __init__(self, data):
+        self.data = data
+        self.anchor = data["anchor"]
+        self.columns = [key for key, _ in data["columns"]]
+        self.edges = [x for _, x in data["columns"]]
+        self.anchor_x = data.get("anchor_x", self.edges[0] if self.edges else 0)
+        self.footer_offset = data.get("footer_offset")
+
+    def shift(self, header_line):
+        """Horizontal offset of this page's header vs. the learned one (scans are rarely aligned)."""
+        return header_line.x - self.anchor_x
+
+    def header_columns(self, dx=0):
+        """Column key -> x, as parser.table.header_columns() found it, moved by the page shift dx."""
+        return {key: x + dx for key, x in zip(self.columns, self.edges)}
+
+    def footer_start(self, lines, header_index):
+        """Index of the first line that can belong to the footer."""
+        if self.footer_offset is None:
+            return header_index + 1
+        limit = lines[header_index].y + self.footer_offset - FOOTER_SLACK
+        for i in range(header_index + 1, len(lines)):
+            if lines[i].y >= limit:
+                return i
+        return len(lines)
+
+
+def learn_template(header_line, columns, lines, header_index, tags):
+    """Builds template data from a page parsed the slow way (header search + synonyms)."""
+    edges = sorted(((key, x) for key, x in columns.items()), key=lambda c: c[1])
+    footer_offset = None
+    for i in range(header_index + 1, len(lines)):
+        if tags[i].tag == SIGNATURE:
+            footer_offset = lines[i].y - lines[header_index].y
+            break
+    return {
+        "anchor": anchor_key(header_line.text),
+        "columns": edges,
+        "anchor_x": header_line.x,
+        "footer_offset": footer_offset,
+        "learned_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+    }
+
+
+# templates path -> {"templates": {anchor: LayoutTemplate}, "mtime_ns": int, "checked_at": float}
+_CACHE = {}
+_LOCK = threading.Lock()
+
+def _mtime_ns(path):
+    try:
+        return path.stat().st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+def _load(path):
+    if not path.exists():
+        return []
+    with open(path, "r") as f:
+        try:
+            return json.load(f)
+        except json.JSONDecodeError:
+            print(f"⚠️ Warning: {path.name} corrupted. Ignoring layout templates.")
+            return []
+
+def get_templates(tenant_id="default_tenant"):
+    """{anchor: LayoutTemplate} for the tenant, cached like the correction memory."""
+    path = get_tenant_paths(tenant_id)["templates"]
+    now = time.monotonic()
+    entry = _CACHE.get(path)
+    if entry and now - entry["checked_at"] < TEMPLATE_RECHECK_SECONDS:
+        return entry["templates"]
+
+    with _LOCK:
+        mtime_ns = _mtime_ns(path)
+        entry = _CACHE.get(path)
+        if not (entry and entry["mtime_ns"] == mtime_ns):
+            templates = {t["anchor"]: LayoutTemplate(t) for t in _load(path)}
+            entry = _CACHE[path] = {"templates": templates, "mtime_ns": mtime_ns}
+        entry["checked_at"] = now
+        return entry["templates"]
+
+def save_template(tenant_id, data):
+    """Adds (or replaces) one template, keeping the newest MAX_TEMPLATES_PER_TENANT."""
+    path = get_tenant_paths(tenant_id)["templates"]
+    # Same cross-process lock as the correction memory: render stages, workers
+    # and API replicas may all learn templates for one tenant at once
+    with memory_lock(path):
+        templates = [t for t in _load(path) if t["anchor"] != data["anchor"]]
+        templates.append(data)
+        templates = templates[-MAX_TEMPLATES_PER_TENANT:]
+
+        # A tmp file of our own, so a crashed writer never leaves half a file for the next one
+        with tempfile.NamedTemporaryFile("w", dir=path.parent, prefix=path.stem, suffix=".tmp", delete=False) as f:
+            json.dump(templates, f, indent=2)
+        os.replace(f.name, path)
+    with _LOCK:
+        _CACHE.pop(path, None)
+
+def match_template(lines, tenant_id="default_tenant"):
+    """
+    Returns (template, header_index) when a line's text is a known header anchor,
+    else (None, None). One dict lookup per line; no synonym matching.
+    """
+    if not LAYOUT_TEMPLATES:
+        return None, None
+    templates = get_templates(tenant_id)
+    if not templates:
+        return None, None
+    for idx, line in enumerate(lines):
+        template = templates.get(anchor_key(line.text))
+        if template is not None:
+            return template, idx
+    return None, None
@@ -1,77 +1,91 @@
 #review/excel_diff.py
-import pandas as pd
-import json
 from openpyxl import load_workbook
-from memory.corrections import record_human_correction
+from memory.corrections import CorrectionBatch
+from output.excel_writer import read_original_rows, parse_amount
 
 LEARNABLE_COLUMNS = ["Name", "Service", "Amount"]
 
-def diff_and_learn(corrected_path):
+def _cell_text(value):
+    """Cell value as the string the parser would have produced (1000.0 -> "1000")."""
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value).strip()
+
+def read_corrected_rows(ws, limit):
+    """
+    Streams the 'Invoice Audit' sheet once: finds the header row (the first row
+    with a "Name" cell) and returns up to `limit` rows below it, as dicts of the
+    LEARNABLE_COLUMNS only. None if there is no header.
+    """
+    positions = None
+    rows = []
+    for values in ws.iter_rows(values_only=True):
+        if positions is None:
+            if "Name" in values:
+                positions = {col: values.index(col) for col in LEARNABLE_COLUMNS if col in values}
+            continue
+        if len(rows) >= limit:
+            break
+        rows.append({
+            col: _cell_text(values[idx]) if idx < len(values) else ""
+            for col, idx in positions.items()
+        })
+    return rows if positions is not None else None
+
+def diff_and_learn(corrected_path, tenant_id=None):
     """
-    Opens the corrected Excel, extracts original AI data from the hidden 
+    Opens the corrected Excel, extracts original AI data from the hidden
     metadata sheet, and learns the differences.
+    `tenant_id` (the uploader's tenant) must match the one stamped in METADATA;
+    without it the stamped tenant is used (offline mass training).
+    Returns the number of corrections learned.
     """
     print(f"🧐 Analyzing corrections in: {corrected_path.name}")
-    
-    # 1. Load the Excel using openpyxl to get the hidden metadata
-    wb = load_workbook(corrected_path, data_only=True)
-    
-    if "METADATA" not in wb.sheetnames:
-        print("❌ Error: No METADATA sheet found. Cannot learn from this file.")
-        return
 
-    ws_meta = wb["METADATA"]
-    tenant_id = ws_meta.cell(row=1, column=2).value
-    original_data_json = ws_meta.cell(row=2, column=2).value
-    
-    # 2. Convert metadata back to a list of dictionaries
-    original_rows = json.loads(original_data_json)
+    # 1. One read-only pass over the workbook (rows are streamed from the zip, not loaded)
+    wb = load_workbook(corrected_path, read_only=True, data_only=True)
+    try:
+        if "METADATA" not in wb.sheetnames:
+            print("❌ Error: No METADATA sheet found. Cannot learn from this file.")
+            return 0
 
-    # 3. Read the 'Invoice Audit' sheet (where the human made changes)
-    # we use header=6 because your excel_writer has several header/summary lines
-    # We'll search for the row where 'Name' appears to be safe.
-    df_corrected = pd.read_excel(corrected_path, sheet_name="Invoice Audit")
-    
-    # Find the header row dynamically (looking for "Name" column)
-    header_row_index = None
-    for i, row in df_corrected.iterrows():
-        if "Name" in row.values:
-            header_row_index = i
-            break
-            
-    if header_row_index is None:
-        print("❌ Error: Could not find data table in Excel.")
-        return
+        ws_meta = wb["METADATA"]
+        file_tenant = next(ws_meta.iter_rows(min_row=1, max_row=1, values_only=True))[1]
+        if tenant_id is None:
+            tenant_id = file_tenant
+        elif str(file_tenant) != str(tenant_id):
+            raise ValueError("This workbook was generated for a different tenant.")
+
+        # 2. Convert metadata back to a list of dictionaries (the json may span several cells)
+        original_rows = read_original_rows(ws_meta)
+
+        # 3. Read the 'Invoice Audit' sheet (where the human made changes)
+        corrected_rows = read_corrected_rows(wb["Invoice Audit"], len(original_rows))
+    finally:
+        wb.close()
 
-    # Re-read with the correct header
-    df_corrected = pd.read_excel(corrected_path, sheet_name="Invoice Audit", skiprows=header_row_index + 1)
-    df_corrected = df_corrected.fillna("")
+    if corrected_rows is None:
+        print("❌ Error: Could not find data table in Excel.")
+        return 0
 
     # 4. Compare Original (AI) vs Corrected (Human)
-    # We iterate based on the original data length
+    # We iterate based on the original data length; everything learned from
+    # this file is committed as one memory version when the batch closes
     learned_count = 0
-    for i, orig_row in enumerate(original_rows):
-        if i >= len(df_corrected):
-            break
-            
-        corr_row = df_corrected.iloc[i].to_dict()
-
-        # Check each learnable field
-        for field in LEARNABLE_COLUMNS:
-            orig_val = str(orig_row.get(field, "")).strip()
-            # Clean numeric strings to match (e.g., "100.0" vs "100")
-            corr_val = str(corr_row.get(field, "")).strip()
+    with CorrectionBatch(tenant_id) as batch:
+        for orig_row, corr_row in zip(original_rows, corrected_rows):
+            # The writer stores amounts as numbers ("1,000" -> 1000.0): an unchanged value is not a correction
+            orig_amount = str(orig_row.get("Amount", "")).strip()
+            corr_amount = parse_amount(corr_row["Amount"]) if corr_row.get("Amount") else None
+            if corr_amount is not None and parse_amount(orig_amount) == corr_amount:
+                corr_row["Amount"] = orig_amount
 
-            if orig_val != corr_val and corr_val != "":
-                # Trigger the versioned learning!
-                record_human_correction(
-                    original_row=orig_row,
-                    corrected_row=corr_row,
-                    tenant_id=tenant_id
-                )
-                learned_count += 1
+            learned_count += batch.add(orig_row, corr_row)
 
     if learned_count > 0:
         print(f"✅ Success: Learned {learned_count} new patterns for tenant [{tenant_id}].")
     else:
-        print("ℹ️ No changes detected. Nothing new to learn.")
\ No newline at end of file
+        print("ℹ️ No changes detected. Nothing new to learn.")
+    return learned_count
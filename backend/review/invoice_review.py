@@ -1,43 +1,62 @@
 #review/invoice_review
 import re
 
-def evaluate_invoice(rows, footer):
-    reasons = []
-    if not rows:
-        reasons.append("No rows extracted")
-        return "NEEDS_REVIEW", reasons
-
-    calculated_total = 0
-    
-    for idx, row in enumerate(rows, start=1):
+class InvoiceEvaluator:
+    """
+    Audits an invoice row by row, so it can sit on the parser's row stream
+    instead of re-walking a finished list. add() each row, then result().
+    """
+
+    def __init__(self, footer):
+        self.footer = footer
+        self.reasons = []
+        self.count = 0
+        self.calculated_total = 0
+
+    def add(self, row):
+        self.count += 1
+        idx = self.count
+
         # 1. Missing fields check
-        for field in ["Name", "Service", "Amount"]:
-            if not row.get(field):
-                reasons.append(f"Row {idx}: Missing {field}")
+        for field, value in (("Name", row.name), ("Service", row.service), ("Amount", row.amount)):
+            if not value:
+                self.reasons.append(f"Row {idx}: Missing {field}")
 
         # 2. Status check (using your parser/review.py labels)
-        status = row.get("Review_Status")
+        status = row.review_status
         if status in ["CHECK_OCR", "CHECK_AMOUNT"]:
-            reasons.append(f"Row {idx}: Flagged as {status}")
+            self.reasons.append(f"Row {idx}: Flagged as {status}")
 
         # 3. Summing for total check
         try:
-            amt_str = str(row.get("Amount", "0")).replace(",", "").strip()
-            calculated_total += float(amt_str)
+            amt_str = str(row.amount).replace(",", "").strip()
+            self.calculated_total += float(amt_str)
         except:
             pass # Invalid amounts are already caught by Review_Status
 
-    # --- THE TOTAL MATCH CHECK ---
-    # Look for "Total" in the footer keys
-    printed_total_str = footer.get("Total") or footer.get("TOTAL") or "0"
-    try:
-        # Clean the printed total (e.g., "RWF 50,000" -> 50000)
-        printed_total = float(re.sub(r"[^\d.]", "", str(printed_total_str)))
-        
-        if abs(calculated_total - printed_total) > 0.01:
-            reasons.append(f"Math Mismatch: Rows sum to {calculated_total}, but Invoice says {printed_total}")
-    except:
-        reasons.append("Could not verify Total: Printed total is not a valid number")
-
-    invoice_status = "NEEDS_REVIEW" if reasons else "OK"
-    return invoice_status, reasons
\ No newline at end of file
+    def result(self):
+        """(status, reasons) for the rows seen so far."""
+        if not self.count:
+            return "NEEDS_REVIEW", ["No rows extracted"]
+
+        reasons = list(self.reasons)
+        # --- THE TOTAL MATCH CHECK ---
+        # Look for "Total" in the footer keys
+        printed_total_str = self.footer.get("Total") or self.footer.get("TOTAL") or "0"
+        try:
+            # Clean the printed total (e.g., "RWF 50,000" -> 50000)
+            printed_total = float(re.sub(r"[^\d.]", "", str(printed_total_str)))
+
+            if abs(self.calculated_total - printed_total) > 0.01:
+                reasons.append(f"Math Mismatch: Rows sum to {self.calculated_total}, but Invoice says {printed_total}")
+        except:
+            reasons.append("Could not verify Total: Printed total is not a valid number")
+
+        invoice_status = "NEEDS_REVIEW" if reasons else "OK"
+        return invoice_status, reasons
+
+def evaluate_invoice(rows, footer):
+    evaluator = InvoiceEvaluator(footer)
+    for row in rows:
+        evaluator.add(row)
+    return evaluator.result()
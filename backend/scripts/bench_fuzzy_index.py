@@ -0,0 +1,73 @@
+import os
+import sys
+import time
+import random
+import difflib
+
+# 1. Add the project root to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from memory.fuzzy_index import FuzzyIndex
+
+# Usage: python scripts/bench_fuzzy_index.py [sizes...]
+SIZES = [int(n) for n in sys.argv[1:]] or [100, 10_000, 100_000]
+QUERIES = 200
+BASELINE_BUDGET_SECONDS = 10   # difflib at 100k keys is ~1s per row, so sample it
+
+SYLLABLES = ["mu", "gi", "sha", "uwi", "ma", "na", "ha", "bi", "nyo", "zi", "ka", "nshi", "ga", "ki",
+             "ri", "jean", "ma", "rie", "cla", "ude", "eri", "ali", "ce", "pa", "tri", "ck", "dia", "ne"]
+SERVICES = ["Consultation", "Laboratory", "X-Ray", "Pharmacy", "Dental", "Physio", "Ultrasound", "Surgery"]
+
+
+def fake_word(rng, parts):
+    return "".join(rng.choice(SYLLABLES) for _ in range(parts)).capitalize()
+
+
+def fake_text(rng):
+    """A client name or service line, the kind of key tenants teach the system."""
+    if rng.random() < 0.6:
+        return f"{fake_word(rng, rng.randint(2, 3))} {fake_word(rng, rng.randint(2, 4))}"
+    return f"{rng.choice(SERVICES)} {fake_word(rng, 2)} {rng.randint(1, 999)}"
+
+
+def ocr_noise(rng, text):
+    """A couple of character slips, like a learned OCR error."""
+    chars = list(text)
+    for _ in range(rng.randint(0, 2)):
+        chars[rng.randrange(len(chars))] = rng.choice("aeilo01 ")
+    return "".join(chars)
+
+
+def run(size, rng):
+    keys = list(dict.fromkeys(ocr_noise(rng, fake_text(rng)) for _ in range(size)))
+    # Half the rows are near a learned key, half are new text
+    queries = [ocr_noise(rng, rng.choice(keys)) if i % 2 else fake_text(rng) for i in range(QUERIES)]
+
+    start = time.perf_counter()
+    index = FuzzyIndex(keys)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    indexed = [index.best_match(q, cutoff=0.8) for q in queries]
+    index_us = (time.perf_counter() - start) / len(queries) * 1e6
+
+    # Baseline on as many queries as fit the budget; results must agree
+    start = time.perf_counter()
+    checked = 0
+    for q, expected in zip(queries, indexed):
+        matches = difflib.get_close_matches(q, keys, n=1, cutoff=0.8)
+        assert (matches[0] if matches else None) == expected, f"Mismatch for {q!r}"
+        checked += 1
+        if time.perf_counter() - start > BASELINE_BUDGET_SECONDS:
+            break
+    difflib_us = (time.perf_counter() - start) / checked * 1e6
+
+    print(f"{len(keys):>8} keys | build {build_ms:9.1f} ms | index {index_us:10.1f} us/row | "
+          f"difflib {difflib_us:12.1f} us/row ({checked} rows checked) | x{difflib_us / index_us:.0f}")
+
+
+if __name__ == "__main__":
+    rng = random.Random(42)
+    print("📊 Fuzzy lookup, cutoff=0.8 (same result as difflib.get_close_matches n=1)")
+    for size in SIZES:
+        run(size, rng)
@@ -0,0 +1,55 @@
+import io
+import os
+import sys
+
+# 1. Add the project root to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from openpyxl import load_workbook
+
+import output.excel_writer as excel_writer
+from output.excel_writer import write_excel, read_original_rows
+from parser.models import InvoiceRow
+
+# Usage: python scripts/check_excel_metadata.py
+# Round-trips the METADATA json with every chunk size up to the payload length, so each
+# character (including "=", which openpyxl would otherwise write as a formula) lands
+# at the start of a chunk at least once. Exits 1 on the first mismatch.
+
+ROWS = [
+    InvoiceRow(name="A=B", telephone="=0788", service="+Consultation", amount="1,000",
+               review_status="OK"),
+    InvoiceRow(name="@Client", telephone="-", service="X-Ray = 2", amount="=SUM(1)",
+               review_status="CHECK_AMOUNT"),
+]
+
+
+def round_trip(chunk_chars):
+    excel_writer.METADATA_CHUNK_CHARS = chunk_chars
+    buffer = io.BytesIO()
+    write_excel([], iter(ROWS), {}, buffer, tenant_id="check")
+    buffer.seek(0)
+    # Opened the way review/excel_diff.py opens corrected files
+    wb = load_workbook(buffer, read_only=True, data_only=True)
+    try:
+        return read_original_rows(wb["METADATA"])
+    finally:
+        wb.close()
+
+
+if __name__ == "__main__":
+    default_chunk = excel_writer.METADATA_CHUNK_CHARS
+    expected = [row.to_dict() for row in ROWS]
+    payload_chars = len(str(expected)) + 20
+
+    for chunk_chars in list(range(1, payload_chars)) + [default_chunk]:
+        try:
+            restored = round_trip(chunk_chars)
+        except ValueError as e:
+            print(f"❌ Chunk size {chunk_chars}: METADATA could not be read back ({e})")
+            sys.exit(1)
+        if restored != expected:
+            print(f"❌ Chunk size {chunk_chars}: METADATA changed on the way through Excel")
+            sys.exit(1)
+
+    print(f"✅ METADATA round-trips for chunk sizes 1..{payload_chars - 1} and {default_chunk}")
@@ -0,0 +1,45 @@
+import os
+import sys
+import json
+from pathlib import Path
+
+# 1. Add the project root to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tenants.manager import get_tenant_paths
+from memory.corrections import load_memory
+from memory.store import PATTERN_KINDS, import_memory, export_memory
+
+# Usage: python scripts/memory_sync.py import|export <tenant_id> [path]
+# Moves a tenant's correction memory between its JSON file and the correction_patterns table.
+# The path defaults to the tenant's correction_memory.json.
+
+
+def import_file(tenant_id, path):
+    memory = load_memory(path)
+    version = import_memory(tenant_id, memory)
+    count = sum(len(memory.get(kind, {})) for kind in PATTERN_KINDS)
+    print(f"✅ Imported {count} patterns from {path} for [{tenant_id}] as v{version}")
+
+
+def export_file(tenant_id, path):
+    # Pattern sections come from the database; keywords/known_clients are kept from the file
+    memory = load_memory(path) if Path(path).exists() else {}
+    memory.update(export_memory(tenant_id))
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(memory, f, indent=2)
+    print(f"✅ Exported v{memory['meta']['version']} of [{tenant_id}] to {path}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3 or sys.argv[1] not in ("import", "export"):
+        print("Usage: python scripts/memory_sync.py import|export <tenant_id> [path]")
+        sys.exit(1)
+
+    command, tenant_id = sys.argv[1], sys.argv[2]
+    path = Path(sys.argv[3]) if len(sys.argv) > 3 else get_tenant_paths(tenant_id)["memory"]
+    if command == "import":
+        import_file(tenant_id, path)
+    else:
+        export_file(tenant_id, path)
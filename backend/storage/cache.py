@@ -0,0 +1,140 @@
+#storage/cache.py
+import os
+import json
+import hashlib
+import threading
+from pathlib import Path
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+def sha256_stream(fileobj):
+    """Hashes a binary file object in chunks and rewinds it for the next reader."""
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: fileobj.read(HASH_CHUNK_SIZE), b""):
+        digest.update(chunk)
+    fileobj.seek(0)
+    return digest.hexdigest()
+
+def sha256_file(path):
+    with open(path, "rb") as f:
+        return sha256_stream(f)
+
+
+class ContentCache:
+    """
+    Size-bounded, content-addressed cache on local disk.
+    Entries live at <root>/<key[:2]>/<key>; the file mtime is the LRU clock,
+    so every process sharing the directory sees the same recency order.
+    """
+
+    # Re-scan the directory every N writes to pick up entries from other processes
+    RESCAN_EVERY = 200
+
+    def __init__(self, root, max_bytes):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._index = None  # key -> (size, mtime)
+        self._total_bytes = 0
+        self._writes = 0
+        self._lock = threading.Lock()
+
+    def _path(self, key):
+        return self.root / key[:2] / key
+
+    def get_bytes(self, key):
+        path = self._path(key)
+        try:
+            data = path.read_bytes()
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+
+        # Touch on read so recently used entries survive eviction
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        self.hits += 1
+        return data
+
+    def put_bytes(self, key, data):
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        # Write-then-rename so concurrent readers never see a half-written entry
+        tmp_path = path.with_name(f".{key}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            self._load_index()
+            old_size = self._index.get(key, (0, 0))[0]
+            self._index[key] = (len(data), path.stat().st_mtime)
+            self._total_bytes += len(data) - old_size
+            self._writes += 1
+            if self._writes % self.RESCAN_EVERY == 0:
+                self._index = None
+                self._load_index()
+            self._evict()
+
+    def get(self, key):
+        """JSON convenience wrapper around get_bytes."""
+        data = self.get_bytes(key)
+        return json.loads(data) if data is not None else None
+
+    def put(self, key, value):
+        self.put_bytes(key, json.dumps(value, separators=(",", ":")).encode("utf-8"))
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "evictions": self.evictions,
+            "bytes": self._total_bytes,
+            "max_bytes": self.max_bytes
+        }
+
+    def _load_index(self):
+        if self._index is not None:
+            return
+        self._index = {}
+        self._total_bytes = 0
+        if not self.root.exists():
+            return
+        for path in self.root.glob("*/*"):
+            if path.name.startswith("."):
+                continue
+            try:
+                st = path.stat()
+            except FileNotFoundError:
+                continue
+            self._index[path.name] = (st.st_size, st.st_mtime)
+            self._total_bytes += st.st_size
+
+    def _evict(self):
+        if self._total_bytes <= self.max_bytes:
+            return
+
+        # Refresh mtimes first: hits in other processes only show up on disk
+        for key in list(self._index):
+            try:
+                st = self._path(key).stat()
+                self._index[key] = (st.st_size, st.st_mtime)
+            except FileNotFoundError:
+                self._total_bytes -= self._index.pop(key)[0]
+
+        for key, (size, _) in sorted(self._index.items(), key=lambda kv: kv[1][1]):
+            if self._total_bytes <= self.max_bytes:
+                break
+            try:
+                self._path(key).unlink()
+            except FileNotFoundError:
+                pass
+            del self._index[key]
+            self._total_bytes -= size
+            self.evictions += 1
@@ -3,6 +3,9 @@ from pathlib import Path
 # Identify the project root
 BASE_DIR = Path(__file__).resolve().parent.parent
 
+# Tenants whose folders were already created by this process
+_PREPARED_TENANTS = set()
+
 def get_tenant_paths(tenant_id="default_tenant"):
     """
     Returns a dictionary of paths for the given tenant.
@@ -11,16 +14,19 @@ def get_tenant_paths(tenant_id="default_tenant"):
     t_runtime = BASE_DIR / "runtime" / "tenants" / tenant_id
     t_memory = BASE_DIR / "memory" / "tenants" / tenant_id
     
-    # Ensure folders exist automatically
-    (t_runtime / "clean").mkdir(parents=True, exist_ok=True)
-    (t_runtime / "review").mkdir(parents=True, exist_ok=True)
-    (t_runtime / "processed_originals").mkdir(parents=True, exist_ok=True)
-    t_memory.mkdir(parents=True, exist_ok=True)
+    # Ensure folders exist automatically (once per tenant per process)
+    if tenant_id not in _PREPARED_TENANTS:
+        (t_runtime / "clean").mkdir(parents=True, exist_ok=True)
+        (t_runtime / "review").mkdir(parents=True, exist_ok=True)
+        (t_runtime / "processed_originals").mkdir(parents=True, exist_ok=True)
+        t_memory.mkdir(parents=True, exist_ok=True)
+        _PREPARED_TENANTS.add(tenant_id)
     
     return {
         "clean": t_runtime / "clean",
         "review": t_runtime / "review",
         "originals": t_runtime / "processed_originals",
         "memory": t_memory / "correction_memory.json",
+        "templates": t_memory / "layout_templates.json",
         "base": t_runtime
     }
\ No newline at end of file